@@ -0,0 +1,104 @@
+"""
+Batch scoring for patient cohorts.
+
+Usage:
+    python -m batch_scoring score input.csv output.csv [--chunksize 50000] [--validation-policy clip|drop|raise]
+
+Rows are validated like training data: out-of-range values are clipped (or the
+row dropped, or scoring stopped) and rows with missing or non-0/1 values are
+left out of the output; counts are logged per chunk.
+"""
+import argparse
+import logging
+import sys
+from typing import Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import FEATURE_NAMES, VALIDATION_POLICIES, log_issues, validate_frame
+from inference import DECISION_THRESHOLD, prediction_label, preprocess_batch, score_batch
+from model_registry import MODEL_PATH, SCALER_PATH, get_model_and_scaler
+from risk_rules import risk_rules
+
+DEFAULT_CHUNKSIZE = 50_000
+OUTPUT_COLUMNS = ["prob_low_risk", "prob_high_risk", "prediction", "risk_label"] + risk_rules.columns + ["risk_factor_count"]
+
+
+def score_frame(df: pd.DataFrame, model, scaler, threshold: float = None, policy: str = "clip") -> pd.DataFrame:
+    """
+    Validates `df` under `policy` and scores the remaining rows with one scaler
+    call and one predict_proba call.
+
+    Returns the validated rows with probability, predicted-class and label columns
+    appended, followed by one 0/1 column per risk rule and the number flagged.
+    """
+    validated, issues = validate_frame(df, policy, labelled=False)
+    log_issues(issues, policy, "batch scoring input")
+    if len(validated) < len(df):
+        logging.warning(f"Batch scoring: skipped {len(df) - len(validated)} of {len(df)} rows that failed validation")
+    df = validated
+    rows = df[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    features = preprocess_batch(rows, scaler)
+    labels, proba = score_batch(model, features, threshold)
+    scored = df.copy()
+    scored["prob_low_risk"] = proba[:, 0]
+    scored["prob_high_risk"] = proba[:, 1]
+    scored["prediction"] = labels
+    scored["risk_label"] = np.where(labels == 1, prediction_label[1], prediction_label[0])
+    for name, column in risk_rules.flag_columns(rows).items():
+        scored[name] = column
+    return scored
+
+
+def iter_scored_chunks(source: Union[str, pd.DataFrame], model, scaler, chunksize: int = DEFAULT_CHUNKSIZE,
+                       threshold: float = None, policy: str = "clip") -> Iterator[pd.DataFrame]:
+    """Yields scored chunks of a CSV path or DataFrame, never holding more than one chunk."""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield score_frame(source.iloc[start:start + chunksize], model, scaler, threshold, policy)
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            yield score_frame(chunk, model, scaler, threshold, policy)
+
+
+def score_csv(input_path: str, output_path: str, model_path: str = MODEL_PATH,
+              scaler_path: str = SCALER_PATH, chunksize: int = DEFAULT_CHUNKSIZE,
+              threshold: float = None, policy: str = "clip") -> int:
+    """
+    Scores `input_path` chunk by chunk and streams the results to `output_path`.
+
+    Returns the number of rows written.
+    """
+    model, scaler = get_model_and_scaler(model_path, scaler_path)
+    rows = 0
+    for i, scored in enumerate(iter_scored_chunks(input_path, model, scaler, chunksize, threshold, policy)):
+        scored.to_csv(output_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        rows += len(scored)
+        logging.info(f"Batch scoring: wrote chunk {i + 1} ({rows} rows so far) to {output_path}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch_scoring", description="Score patient cohorts in bulk.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    score = subparsers.add_parser("score", help="Score a CSV with the training feature columns")
+    score.add_argument("input", help="Input CSV path")
+    score.add_argument("output", help="Output CSV path")
+    score.add_argument("--model", default=MODEL_PATH, help="Path to the trained model")
+    score.add_argument("--scaler", default=SCALER_PATH, help="Path to the fitted scaler")
+    score.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows scored per chunk")
+    score.add_argument("--threshold", type=float, default=DECISION_THRESHOLD,
+                       help="Label a row High Risk when P(High Risk) is above this value")
+    score.add_argument("--validation-policy", choices=VALIDATION_POLICIES, default="clip",
+                       help="How to handle values outside the prediction form's bounds")
+    args = parser.parse_args(argv)
+
+    rows = score_csv(args.input, args.output, args.model, args.scaler, args.chunksize, args.threshold,
+                     args.validation_policy)
+    print(f"Scored {rows} rows: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
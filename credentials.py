@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import bcrypt
+
+import managed_db
+from metrics import metrics
+
+# ---------------------------------------
+# Configuration
+# ---------------------------------------
+# bcrypt work factor for new hashes; existing hashes with a different cost are rehashed on login.
+BCRYPT_ROUNDS = int(os.environ.get("PULMO_BCRYPT_ROUNDS", 12))
+AUTH_WORKERS = int(os.environ.get("PULMO_AUTH_WORKERS", min(4, os.cpu_count() or 1)))
+# Hash/verify jobs allowed to wait or run at once before new ones are turned away.
+AUTH_MAX_PENDING = int(os.environ.get("PULMO_AUTH_MAX_PENDING", AUTH_WORKERS * 8))
+AUTH_TIMEOUT = float(os.environ.get("PULMO_AUTH_TIMEOUT", 10.0))
+
+LOGIN_MAX_FAILURES = int(os.environ.get("PULMO_LOGIN_MAX_FAILURES", 5))
+LOGIN_WINDOW_SECONDS = float(os.environ.get("PULMO_LOGIN_WINDOW_SECONDS", 300))
+
+
+class CredentialPoolBusy(RuntimeError):
+    """Raised when the credential pool already holds its maximum number of jobs."""
+
+
+def bcrypt_cost(hashed) -> Optional[int]:
+    """Returns the work factor encoded in a bcrypt hash ($2b$12$...), or None if it is not one."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode("utf-8")
+    if not isinstance(hashed, (bytes, bytearray)):
+        return None
+    parts = bytes(hashed).split(b"$")
+    if len(parts) < 4 or not parts[1].startswith(b"2"):
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+
+def needs_rehash(hashed, rounds: int = BCRYPT_ROUNDS) -> bool:
+    cost = bcrypt_cost(hashed)
+    return cost is not None and cost != rounds
+
+
+def _hash(password: str, rounds: int) -> bytes:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
+
+
+def _dummy_hash(rounds: int) -> bytes:
+    """Hash of a random secret; logins for unknown usernames are checked against it."""
+    return bcrypt.hashpw(os.urandom(16), bcrypt.gensalt(rounds))
+
+
+def _verify(password: str, hashed) -> bool:
+    if isinstance(hashed, str):
+        hashed = hashed.encode("utf-8")
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed)
+    except (ValueError, TypeError):
+        # Not a bcrypt hash (e.g. a legacy row), so it can never match.
+        return False
+
+
+class CredentialPool:
+    """
+    Bounded worker pool for bcrypt.
+
+    bcrypt releases the GIL while hashing, so worker threads keep the CPU-heavy
+    work off the Streamlit script threads. At most `max_pending` jobs may be
+    queued or running; further submissions raise CredentialPoolBusy instead of
+    growing the backlog.
+    """
+
+    def __init__(self, workers: int = AUTH_WORKERS, max_pending: int = AUTH_MAX_PENDING,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.stats = {"submitted": 0, "completed": 0, "rejected": 0, "max_queue_depth": 0, "busy_seconds": 0.0}
+        # Computed on a worker at startup so no login pays for it on the calling thread.
+        self._dummy = self._submit(_dummy_hash, rounds)
+
+    def _submit(self, fn: Callable[..., Any], *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                metrics.inc("pulmo_credential_rejected_total")
+                raise CredentialPoolBusy(f"{self._pending} credential checks already pending")
+            self._pending += 1
+            self.stats["submitted"] += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._pending - self._running)
+        return self._executor.submit(self._run, fn, *args)
+
+    def _run(self, fn: Callable[..., Any], *args):
+        with self._lock:
+            self._running += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self.stats["completed"] += 1
+                self.stats["busy_seconds"] += elapsed
+            metrics.observe("pulmo_credential_job_seconds", elapsed, job=fn.__name__.lstrip("_"))
+
+    def hash_password_async(self, password: str) -> Future:
+        return self._submit(_hash, password, self.rounds)
+
+    def hash_password(self, password: str, timeout: float = AUTH_TIMEOUT) -> bytes:
+        return self.hash_password_async(password).result(timeout)
+
+    def verify_password(self, password: str, hashed, timeout: float = AUTH_TIMEOUT) -> bool:
+        return self._submit(_verify, password, hashed).result(timeout)
+
+    def dummy_hash(self, timeout: float = AUTH_TIMEOUT) -> bytes:
+        """Stand-in hash checked for unknown usernames; waits only if startup has not finished it."""
+        return self._dummy.result(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns counters plus the current queue depth and number of jobs in flight."""
+        with self._lock:
+            return {**self.stats, "queue_depth": self._pending - self._running, "in_flight": self._running,
+                    "rounds": self.rounds}
+
+
+class LoginRateLimiter:
+    """Sliding-window limit on failed logins per username."""
+
+    def __init__(self, max_failures: int = LOGIN_MAX_FAILURES, window_seconds: float = LOGIN_WINDOW_SECONDS):
+        self.max_failures = max_failures
+        self.window = window_seconds
+        self._failures: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, username: str, now: float) -> Deque[float]:
+        failures = self._failures.get(username)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[username]
+        return failures
+
+    def retry_after(self, username: str) -> float:
+        """Seconds until `username` may try again; 0 if an attempt is allowed now."""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._prune(username, now)
+            if len(failures) < self.max_failures:
+                return 0.0
+            return failures[-self.max_failures] + self.window - now
+
+    def record_failure(self, username: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) >= 10000:
+                # Sweep expired entries so guessed usernames cannot grow the table without bound.
+                for name in list(self._failures):
+                    self._prune(name, now)
+            self._failures.setdefault(username, deque()).append(now)
+
+    def reset(self, username: str):
+        with self._lock:
+            self._failures.pop(username, None)
+
+
+pool = CredentialPool()
+rate_limiter = LoginRateLimiter()
+metrics.gauge("pulmo_credential_queue_depth", lambda: pool.snapshot()["queue_depth"])
+metrics.gauge("pulmo_credential_in_flight", lambda: pool.snapshot()["in_flight"])
+
+
+def hash_password(password: str) -> bytes:
+    return pool.hash_password(password)
+
+
+def verify_password(password: str, hashed) -> bool:
+    return pool.verify_password(password, hashed)
+
+
+def _store_rehash(username: str, path: str, future: Future):
+    try:
+        managed_db.update_password(username, future.result(), path)
+        logging.info(f"Rehashed password for {username} at cost {pool.rounds}")
+    except Exception as e:
+        logging.error(f"Error rehashing password for {username}: {e}")
+
+
+def authenticate(username: str, password: str, path: str = managed_db.USERS_DB_PATH) -> Tuple[bool, str]:
+    """
+    Checks a login attempt. Returns (ok, message); the message explains a
+    rejection. A successful login whose stored hash uses a different work
+    factor is rehashed in the background at BCRYPT_ROUNDS.
+    """
+    wait = rate_limiter.retry_after(username)
+    if wait > 0:
+        return False, f"Too many failed attempts. Try again in {int(wait) + 1} seconds."
+
+    hashed = managed_db.get_password_hash(username, path)
+    known = bcrypt_cost(hashed) is not None
+    try:
+        # Unknown usernames still cost one bcrypt check, so response time does not reveal which exist.
+        ok = verify_password(password, hashed if known else pool.dummy_hash()) and known
+    except CredentialPoolBusy:
+        logging.warning(f"Credential pool saturated; rejected login for {username}")
+        return False, "The server is busy. Please try again in a moment."
+
+    if not ok:
+        rate_limiter.record_failure(username)
+        return False, "Incorrect username or password."
+
+    rate_limiter.reset(username)
+    if needs_rehash(hashed, pool.rounds):
+        try:
+            future = pool.hash_password_async(password)
+            future.add_done_callback(lambda f: _store_rehash(username, path, f))
+        except CredentialPoolBusy:
+            pass  # Try again on a later login.
+    return True, ""
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from model_registry import file_digest
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# ---------------------------------------
+# Configure File Paths
+# ---------------------------------------
+BASE_DIR = os.path.dirname(__file__)
+DATA_PATH = os.path.join(BASE_DIR, "..", "data", "lung_cancer_new.csv")
+
+# Bump when the summary layout changes so stale cache files are ignored.
+AGGREGATES_VERSION = 1
+AGE_BIN_WIDTH = 5
+KDE_GRID_POINTS = 64
+KDE_HIST_BINS = 512
+MAX_OUTLIERS = 200
+
+SYMPTOMS = ["persistent_cough", "fatigue", "cough_blood", "chest_pain", "weight_loss"]
+REQUIRED_COLUMNS = ["age", "smoking", "tumor_size", "class"] + SYMPTOMS
+
+
+def normalize_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    df.columns = df.columns.str.lower().str.replace(" ", "_")
+    return df
+
+
+def cache_dir_for(path: str) -> str:
+    """Summaries live in an `aggregates/` folder next to the dataset."""
+    return os.path.join(os.path.dirname(os.path.abspath(path)), "aggregates")
+
+
+# ---------------------------------------
+# Aggregation
+# ---------------------------------------
+def _binned_kde(values: np.ndarray, lo: float, hi: float) -> Dict[str, list]:
+    """
+    Gaussian KDE evaluated on a fixed grid from a fine histogram, so the cost
+    is linear in the number of rows instead of rows x grid points.
+    """
+    grid = np.linspace(lo, hi, KDE_GRID_POINTS)
+    if len(values) < 2 or hi <= lo:
+        return {"y": grid.tolist(), "density": np.zeros_like(grid).tolist()}
+    counts, edges = np.histogram(values, bins=KDE_HIST_BINS, range=(lo, hi))
+    centers = (edges[:-1] + edges[1:]) / 2
+    # Scott's rule, matching Plotly's default violin bandwidth.
+    bandwidth = max(values.std() * len(values) ** (-1 / 5), (hi - lo) / KDE_HIST_BINS)
+    z = (grid[:, None] - centers[None, :]) / bandwidth
+    density = (np.exp(-0.5 * z ** 2) @ counts) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return {"y": np.round(grid, 4).tolist(), "density": np.round(density, 5).tolist()}
+
+
+def _box_stats(values: np.ndarray) -> Dict[str, Any]:
+    if len(values) == 0:
+        return {"q1": None, "median": None, "q3": None, "mean": None,
+                "lowerfence": None, "upperfence": None, "outliers": []}
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(outliers) > MAX_OUTLIERS:
+        outliers = np.sort(outliers)[np.linspace(0, len(outliers) - 1, MAX_OUTLIERS).astype(int)]
+    return {
+        "q1": float(q1), "median": float(median), "q3": float(q3), "mean": float(values.mean()),
+        "lowerfence": float(inside.min()), "upperfence": float(inside.max()),
+        "outliers": outliers.tolist(),
+    }
+
+
+def compute_aggregates(df: "pd.DataFrame") -> Dict[str, Any]:
+    """Computes every chart input of the insights page from the raw frame in one pass."""
+    cls = df["class"].to_numpy().astype(np.int64)
+    smoking = df["smoking"].to_numpy().astype(np.int64)
+    age = df["age"].to_numpy(dtype=np.float64)
+    tumor = df["tumor_size"].to_numpy(dtype=np.float64)
+    high = cls == 1
+    masks = {0: ~high, 1: high}
+
+    class_counts = np.bincount(cls, minlength=2)[:2]
+    smoking_by_class = np.bincount(smoking * 2 + cls, minlength=4)[:4].reshape(2, 2)
+
+    start = np.floor(age.min() / AGE_BIN_WIDTH) * AGE_BIN_WIDTH
+    n_bins = int((age.max() - start) // AGE_BIN_WIDTH) + 1
+    age_idx = ((age - start) // AGE_BIN_WIDTH).astype(np.int64)
+    age_counts = np.bincount(age_idx * 2 + cls, minlength=n_bins * 2).reshape(n_bins, 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        age_density = np.nan_to_num(age_counts / (class_counts * AGE_BIN_WIDTH))
+
+    tumor_lo, tumor_hi = float(tumor.min()), float(tumor.max())
+    symptom_values = df[SYMPTOMS].to_numpy(dtype=np.float64)
+    high_count = max(int(class_counts[1]), 1)
+
+    return {
+        "version": AGGREGATES_VERSION,
+        "rows": int(len(df)),
+        "class_counts": class_counts.tolist(),
+        # smoking_by_class[smoking][class]
+        "smoking_by_class": smoking_by_class.tolist(),
+        "age_hist": {
+            "bin_start": float(start),
+            "bin_width": AGE_BIN_WIDTH,
+            "counts": age_counts.T.tolist(),
+            "density": age_density.T.tolist(),
+        },
+        "tumor_size": {
+            str(level): {"kde": _binned_kde(tumor[mask], tumor_lo, tumor_hi), "box": _box_stats(tumor[mask])}
+            for level, mask in masks.items()
+        },
+        # Percentage of high-risk patients reporting each symptom.
+        "symptom_prevalence": dict(zip(SYMPTOMS, (symptom_values[high].sum(axis=0) / high_count * 100).tolist())),
+    }
+
+
+# ---------------------------------------
+# Cache (keyed by dataset content hash)
+# ---------------------------------------
+_memo: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+_memo_lock = threading.Lock()
+
+
+def _read_cache(cache_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(cache_path) as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get("version") == AGGREGATES_VERSION else None
+
+
+def _write_cache(cache_path: str, summary: Dict[str, Any]):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, separators=(",", ":"))
+    os.replace(tmp_path, cache_path)
+
+
+def get_aggregates(path: str = DATA_PATH, cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns the dataset summary, computing it only when the file's content
+    hash has no summary on disk. Unchanged files (same mtime and size) are
+    served from memory without rehashing.
+    """
+    key = os.path.realpath(path)
+    st = os.stat(key)
+    memo = _memo.get(key)
+    if memo is not None and memo[:2] == (st.st_mtime_ns, st.st_size):
+        return memo[2]
+
+    with _memo_lock:
+        memo = _memo.get(key)
+        if memo is not None and memo[:2] == (st.st_mtime_ns, st.st_size):
+            return memo[2]
+
+        digest = file_digest(key)
+        cache_path = os.path.join(cache_dir or cache_dir_for(key), f"{digest}.json")
+        summary = _read_cache(cache_path)
+        if summary is None:
+            # pandas is only needed to (re)build the cached summary.
+            import pandas as pd
+
+            start = time.perf_counter()
+            header = normalize_columns(pd.read_csv(key, nrows=0))
+            missing = [col for col in REQUIRED_COLUMNS if col not in header.columns]
+            if missing:
+                raise ValueError(f"Dataset is missing required columns: {missing}")
+            usecols = [i for i, col in enumerate(header.columns) if col in REQUIRED_COLUMNS]
+            df = normalize_columns(pd.read_csv(key, usecols=usecols))
+            summary = compute_aggregates(df)
+            summary["sha256"] = digest
+            _write_cache(cache_path, summary)
+            logging.info(f"Aggregated {summary['rows']} rows of {key} in "
+                         f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        _memo[key] = (st.st_mtime_ns, st.st_size, summary)
+        return summary
+
+
+if __name__ == "__main__":
+    import sys
+
+    summary = get_aggregates(sys.argv[1] if len(sys.argv) > 1 else DATA_PATH)
+    print(json.dumps({k: summary[k] for k in ("rows", "class_counts", "sha256")}))
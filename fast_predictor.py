@@ -0,0 +1,385 @@
+"""
+NumPy-only evaluation of the trained soft-voting ensemble.
+
+`compile_ensemble` flattens the fitted RandomForest, GradientBoosting and
+LogisticRegression members of the VotingClassifier into contiguous arrays;
+`FastPredictor` evaluates the soft vote for one or many rows without going
+through sklearn's validation or joblib dispatch. `save_compact`/`load_compact`
+store those arrays as memory-mappable .npy files with a JSON header.
+
+The NumPy traversal wins on the small requests the app and inference server
+send; sklearn's compiled trees are faster past a few hundred rows, so larger
+batches go to the sklearn model when one is attached as `fallback`.
+
+Usage:
+    python -m fast_predictor bench [--model models/voting_model.pkl] [--scaler models/scaler.pkl]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import warnings
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+ARRAY_KEYS = [
+    "rf_feature", "rf_threshold", "rf_left", "rf_right", "rf_value", "rf_roots",
+    "gb_feature", "gb_threshold", "gb_left", "gb_right", "gb_value", "gb_roots",
+    "lr_coef", "lr_intercept", "weights",
+]
+SCALAR_KEYS = ["rf_depth", "gb_depth", "gb_init", "gb_learning_rate"]
+# Largest probability difference from the sklearn model a compiled ensemble may show.
+COMPILE_TOLERANCE = 1e-9
+# Rows traversed at once, and the batch size above which a fallback sklearn model is used.
+BATCH_ROWS = int(os.environ.get("PULMO_FAST_BATCH_ROWS", "256"))
+
+
+def _flatten_trees(trees, leaf_value):
+    """
+    Concatenates sklearn `Tree` objects into flat node arrays.
+
+    Leaves point to themselves and test feature 0, so a fixed number of
+    traversal steps (the maximum depth) lands every row on its leaf.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, depth = 0, 0
+    for tree in trees:
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        idx = np.arange(n, dtype=np.int32)
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, idx, tree.children_left).astype(np.int32) + offset)
+        rights.append(np.where(is_leaf, idx, tree.children_right).astype(np.int32) + offset)
+        values.append(leaf_value(tree))
+        roots.append(offset)
+        offset += n
+        depth = max(depth, tree.max_depth)
+    return (np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+            np.concatenate(rights), np.concatenate(values), np.array(roots, dtype=np.int32), depth)
+
+
+def _class_one_fraction(tree):
+    value = tree.value[:, 0, :]
+    return value[:, 1] / value.sum(axis=1)
+
+
+def _regression_value(tree):
+    return tree.value[:, 0, 0].astype(np.float64)
+
+
+def _gb_init_log_odds(gb, n_features: int) -> float:
+    """
+    Log-odds gradient boosting starts from before any tree, from the public
+    `init_` estimator (a class-prior DummyClassifier by default, or "zero").
+    """
+    if getattr(gb, "loss", None) != "log_loss":
+        raise ValueError(f"Only log_loss gradient boosting can be compiled, not {getattr(gb, 'loss', None)!r}")
+    if isinstance(gb.init_, str):
+        if gb.init_ != "zero":
+            raise ValueError(f"Unsupported gradient boosting init {gb.init_!r}")
+        return 0.0
+    eps = np.finfo(np.float64).eps
+    p1 = float(np.clip(gb.init_.predict_proba(np.zeros((1, n_features)))[0, 1], eps, 1 - eps))
+    return float(np.log(p1 / (1 - p1)))
+
+
+def _check_compiled(compiled: Dict[str, np.ndarray], voting_clf, n_features: int, n_probes: int = 64) -> float:
+    """
+    Compares the compiled arrays with the sklearn model on random probe rows and
+    raises ValueError if they disagree, e.g. after an sklearn upgrade changed
+    how a member predicts. Returns the largest probability difference.
+    """
+    probes = np.random.default_rng(0).normal(size=(n_probes, n_features))
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        expected = voting_clf.predict_proba(probes)
+    diff = float(np.abs(FastPredictor(compiled).predict_proba(probes) - expected).max())
+    if not diff <= COMPILE_TOLERANCE:
+        raise ValueError(f"Compiled ensemble differs from the sklearn model by {diff:.2e}; refusing to export")
+    return diff
+
+
+def compile_ensemble(voting_clf) -> Dict[str, np.ndarray]:
+    """
+    Exports a fitted soft-voting classifier of (rf, gb, lr) into plain NumPy arrays,
+    checked against the model's own predict_proba on probe rows.
+    """
+    if getattr(voting_clf, "voting", None) != "soft":
+        raise ValueError("Only soft-voting classifiers can be compiled")
+    if len(voting_clf.classes_) != 2:
+        raise ValueError("Only binary classifiers can be compiled")
+    named = voting_clf.named_estimators_
+    rf, gb, lr = named["rf"], named["gb"], named["lr"]
+    n_features = voting_clf.n_features_in_
+
+    rf_arrays = _flatten_trees([est.tree_ for est in rf.estimators_], _class_one_fraction)
+    gb_arrays = _flatten_trees([est.tree_ for est in gb.estimators_[:, 0]], _regression_value)
+    gb_init = _gb_init_log_odds(gb, n_features)
+
+    weights = voting_clf.weights if voting_clf.weights is not None else [1.0, 1.0, 1.0]
+    weights = np.asarray(weights, dtype=np.float64)
+
+    compiled = {}
+    for prefix, arrays in (("rf", rf_arrays), ("gb", gb_arrays)):
+        for name, array in zip(("feature", "threshold", "left", "right", "value", "roots"), arrays[:6]):
+            compiled[f"{prefix}_{name}"] = np.ascontiguousarray(array)
+        compiled[f"{prefix}_depth"] = arrays[6]
+    compiled["gb_init"] = gb_init
+    compiled["gb_learning_rate"] = float(gb.learning_rate)
+    compiled["lr_coef"] = np.ascontiguousarray(lr.coef_[0], dtype=np.float64)
+    compiled["lr_intercept"] = np.asarray(lr.intercept_, dtype=np.float64)
+    compiled["weights"] = weights / weights.sum()
+    _check_compiled(compiled, voting_clf, n_features)
+    return compiled
+
+
+COMPACT_FORMAT_VERSION = 1
+HEADER_FILE = "header.json"
+# Narrowest dtypes that keep predictions identical to the sklearn model.
+COMPACT_DTYPES = {
+    "rf_feature": np.int16, "gb_feature": np.int16,
+    "rf_left": np.int32, "rf_right": np.int32, "rf_roots": np.int32,
+    "gb_left": np.int32, "gb_right": np.int32, "gb_roots": np.int32,
+}
+
+
+class ArrayScaler:
+    """StandardScaler replacement backed by the mean/scale stored in a compact header."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def save_compact(directory: str, compiled: Dict[str, np.ndarray], feature_order, numerical_cols, scaler,
+                 source_sha256: Optional[str] = None) -> str:
+    """
+    Writes a compiled ensemble as one .npy file per array plus a small JSON header.
+
+    Array files carry a content-hash prefix and the header is replaced atomically last,
+    so readers never see a half-written version. Files from older versions are removed.
+    `source_sha256` is the hash of the pickle the arrays were compiled from, which lets
+    readers detect an export left behind by a later retrain. Returns the header path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    arrays = {key: np.ascontiguousarray(compiled[key], dtype=COMPACT_DTYPES.get(key)) for key in ARRAY_KEYS}
+    digest = hashlib.sha256()
+    for key in ARRAY_KEYS:
+        digest.update(key.encode("utf-8"))
+        digest.update(arrays[key].tobytes())
+    version = digest.hexdigest()[:12]
+
+    files = {}
+    for key, array in arrays.items():
+        files[key] = f"{version}_{key}.npy"
+        np.save(os.path.join(directory, files[key]), array)
+
+    header = {
+        "format_version": COMPACT_FORMAT_VERSION,
+        "version": version,
+        "feature_order": list(feature_order),
+        "numerical_cols": list(numerical_cols),
+        "scaler": {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()},
+        "scalars": {key: float(compiled[key]) for key in SCALAR_KEYS},
+        "arrays": files,
+        "source_sha256": source_sha256,
+    }
+    header_path = os.path.join(directory, HEADER_FILE)
+    tmp_path = header_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp_path, header_path)
+
+    keep = set(files.values()) | {HEADER_FILE}
+    for name in os.listdir(directory):
+        if name.endswith(".npy") and name not in keep:
+            os.remove(os.path.join(directory, name))
+    return header_path
+
+
+def remove_compact(directory: str) -> bool:
+    """Deletes a compact export, header first so readers stop using it; returns whether one existed."""
+    header_path = os.path.join(directory, HEADER_FILE)
+    if not os.path.isdir(directory):
+        return False
+    if os.path.exists(header_path):
+        os.remove(header_path)
+    shutil.rmtree(directory, ignore_errors=True)
+    return True
+
+
+def load_compact(header_path: str, mmap: bool = True) -> Tuple["FastPredictor", ArrayScaler]:
+    """
+    Loads a compact model from its header, memory-mapping the arrays by default.
+
+    Memory-mapped arrays are shared through the page cache by every process that loads them.
+    """
+    with open(header_path) as f:
+        header = json.load(f)
+    if header.get("format_version") != COMPACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format: {header.get('format_version')}")
+    directory = os.path.dirname(header_path)
+    compiled = {
+        key: np.load(os.path.join(directory, name), mmap_mode="r" if mmap else None)
+        for key, name in header["arrays"].items()
+    }
+    compiled.update(header["scalars"])
+    predictor = FastPredictor(compiled)
+    predictor.feature_order = header["feature_order"]
+    predictor.version = header["version"]
+    predictor.source_sha256 = header.get("source_sha256")
+    return predictor, ArrayScaler(header["scaler"]["mean"], header["scaler"]["scale"])
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class FastPredictor:
+    """
+    Evaluates a compiled ensemble; mirrors VotingClassifier.predict_proba for classes [0, 1].
+
+    `fallback`, when set, returns the sklearn model the arrays were compiled from;
+    it scores batches of more than BATCH_ROWS rows.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, compiled: Dict[str, np.ndarray], fallback: Optional[Callable[[], Any]] = None):
+        self.arrays = compiled
+        self.fallback = fallback
+        for key in ARRAY_KEYS:
+            setattr(self, key, compiled[key])
+        self.rf_depth = int(compiled["rf_depth"])
+        self.gb_depth = int(compiled["gb_depth"])
+        self.gb_init = float(compiled["gb_init"])
+        self.gb_learning_rate = float(compiled["gb_learning_rate"])
+        self.n_features_in_ = len(self.lr_coef)
+
+    @staticmethod
+    def _leaves(X, roots, feature, threshold, left, right, depth):
+        # nodes has shape (n_rows, n_trees); every step moves each row one level down every tree.
+        # Indexing the flattened rows is cheaper than a 2-D fancy index.
+        flat = X.ravel()
+        offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(roots, (X.shape[0], len(roots))).copy()
+        for _ in range(depth):
+            go_left = flat[offsets + feature[nodes]] <= threshold[nodes]
+            nodes = np.where(go_left, left[nodes], right[nodes])
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) <= BATCH_ROWS:
+            return self._predict_chunk(X)
+        model = self.fallback() if self.fallback is not None else None
+        if model is not None:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", message="X does not have valid feature names")
+                return model.predict_proba(X)
+        # Without sklearn, chunks keep the (rows, trees) node arrays small.
+        return np.concatenate([self._predict_chunk(X[start:start + BATCH_ROWS])
+                               for start in range(0, len(X), BATCH_ROWS)])
+
+    def _predict_chunk(self, X) -> np.ndarray:
+        # Trees compare float32-cast inputs against float64 thresholds, as sklearn does.
+        X32 = X.astype(np.float32)
+
+        rf_leaves = self._leaves(X32, self.rf_roots, self.rf_feature, self.rf_threshold,
+                                 self.rf_left, self.rf_right, self.rf_depth)
+        p_rf = self.rf_value[rf_leaves].mean(axis=1)
+
+        gb_leaves = self._leaves(X32, self.gb_roots, self.gb_feature, self.gb_threshold,
+                                 self.gb_left, self.gb_right, self.gb_depth)
+        p_gb = _sigmoid(self.gb_init + self.gb_learning_rate * self.gb_value[gb_leaves].sum(axis=1))
+
+        p_lr = _sigmoid(X @ self.lr_coef + self.lr_intercept[0])
+
+        w_rf, w_gb, w_lr = self.weights
+        p1 = w_rf * p_rf + w_gb * p_gb + w_lr * p_lr
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_proba(X).argmax(axis=1)
+
+
+BENCH_BATCH_SIZES = (1, 64, BATCH_ROWS, 1000, 100_000)
+
+
+def benchmark(model, X: np.ndarray, repeats: int = 200, batch_sizes=BENCH_BATCH_SIZES) -> Dict[str, Any]:
+    """
+    Times predict_proba for the sklearn model and its compiled form at each batch size,
+    repeating the rows of `X` as needed.
+
+    "numpy_ms" is the array traversal alone and "fast_ms" the predictor as served, with
+    the sklearn fallback above BATCH_ROWS. Returns the maximum absolute probability
+    difference and per-call latencies in milliseconds.
+    """
+    numpy_only = FastPredictor(compile_ensemble(model))
+    fast = FastPredictor(numpy_only.arrays, fallback=lambda: model)
+    max_diff = float(np.abs(numpy_only.predict_proba(X) - model.predict_proba(X)).max())
+
+    def per_call_ms(fn, rows, n):
+        fn(rows)
+        start = time.perf_counter()
+        for _ in range(n):
+            fn(rows)
+        return (time.perf_counter() - start) / n * 1000
+
+    batches = []
+    for size in batch_sizes:
+        rows = np.resize(X, (size, X.shape[1]))
+        n = max(1, min(repeats, 2000 // size))
+        batches.append({
+            "rows": size,
+            "sklearn_ms": per_call_ms(model.predict_proba, rows, n),
+            "numpy_ms": per_call_ms(numpy_only.predict_proba, rows, n),
+            "fast_ms": per_call_ms(fast.predict_proba, rows, n),
+        })
+    return {"max_abs_diff": max_diff, "batches": batches}
+
+
+def main(argv=None):
+    import pandas as pd
+
+    import joblib
+
+    from inference import preprocess_batch
+    from model_registry import MODEL_PATH, SCALER_PATH
+    from train_model import DATA_PATH, feature_columns
+
+    parser = argparse.ArgumentParser(prog="python -m fast_predictor", description="Compiled ensemble tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench = subparsers.add_parser("bench", help="Compare latency and outputs against the sklearn model")
+    bench.add_argument("--model", default=MODEL_PATH)
+    bench.add_argument("--scaler", default=SCALER_PATH)
+    bench.add_argument("--data", default=DATA_PATH)
+    bench.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    # Benchmark against the sklearn pickle even when a compact export exists.
+    model, scaler = joblib.load(args.model), joblib.load(args.scaler)
+    data = pd.read_csv(args.data)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        X = preprocess_batch(data[feature_columns].to_numpy(dtype=np.float64), scaler)
+        result = benchmark(model, X, args.repeats)
+    print(f"max |p_fast - p_sklearn| = {result['max_abs_diff']:.2e}")
+    print(f"{'rows':>8}{'sklearn ms':>14}{'numpy ms':>14}{'fast ms':>14}{'speedup':>10}")
+    for batch in result["batches"]:
+        print(f"{batch['rows']:>8}{batch['sklearn_ms']:>14.3f}{batch['numpy_ms']:>14.3f}{batch['fast_ms']:>14.3f}"
+              f"{batch['sklearn_ms'] / batch['fast_ms']:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+IMPORTANCE_FILE = "feature_importance.json"
+DEFAULT_REPEATS = 10
+
+
+def importance_path(model_path: str) -> str:
+    """The importance report is stored in the same directory as the model."""
+    return os.path.join(os.path.dirname(model_path), IMPORTANCE_FILE)
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    total = values.sum()
+    return values / total if total > 0 else values
+
+
+def model_importances(voting_clf) -> Dict[str, List[float]]:
+    """
+    Importances read from the fitted ensemble members: impurity importances for
+    the tree ensembles and absolute coefficients for logistic regression (inputs
+    are standardized, so their magnitudes are comparable). Each vector is
+    normalized to sum to 1; "combined" averages them with the voting weights.
+    """
+    per_member = {}
+    for name, estimator in voting_clf.named_estimators_.items():
+        if hasattr(estimator, "feature_importances_"):
+            per_member[name] = _normalize(estimator.feature_importances_)
+        elif hasattr(estimator, "coef_"):
+            per_member[name] = _normalize(np.abs(estimator.coef_).sum(axis=0))
+    weights = voting_clf.weights or [1.0] * len(voting_clf.estimators)
+    weight_by_name = dict(zip([name for name, _ in voting_clf.estimators], weights))
+    combined = sum(weight_by_name[name] * vec for name, vec in per_member.items())
+    result = {name: vec.tolist() for name, vec in per_member.items()}
+    result["combined"] = _normalize(combined).tolist()
+    return result
+
+
+# ---------------------------------------
+# Permutation importance (process pool)
+# ---------------------------------------
+_WORKER_DATA = {}
+# Models fitted on DataFrames warn when scored on plain arrays; the column order is the same.
+_FEATURE_NAME_WARNING = "X does not have valid feature names"
+
+
+def _init_worker(model, X, y, baseline):
+    warnings.filterwarnings("ignore", message=_FEATURE_NAME_WARNING)
+    # Each worker process already provides the parallelism.
+    for estimator in getattr(model, "estimators_", []):
+        if hasattr(estimator, "n_jobs"):
+            estimator.n_jobs = 1
+    _WORKER_DATA.update(model=model, X=X, y=y, baseline=baseline)
+
+
+def _permute_feature(task):
+    """Mean and std of the ROC AUC drop when column `feature` is shuffled."""
+    from sklearn.metrics import roc_auc_score
+
+    feature, n_repeats, seed = task
+    model, X, y = _WORKER_DATA["model"], _WORKER_DATA["X"], _WORKER_DATA["y"]
+    rng = np.random.RandomState(seed + feature)
+    X_perm = X.copy()
+    drops = []
+    for _ in range(n_repeats):
+        X_perm[:, feature] = X[rng.permutation(len(X)), feature]
+        drops.append(_WORKER_DATA["baseline"] - roc_auc_score(y, model.predict_proba(X_perm)[:, 1]))
+    return feature, float(np.mean(drops)), float(np.std(drops))
+
+
+def permutation_importances(model, X, y, n_repeats: int = DEFAULT_REPEATS, workers: Optional[int] = None,
+                            seed: int = 42) -> Dict[str, Any]:
+    """Scores every shuffled column on the held-out split, one feature per pool task."""
+    # Imported here: the insights page reads saved reports and should not load scikit-learn.
+    from sklearn.metrics import roc_auc_score
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=_FEATURE_NAME_WARNING)
+        baseline = float(roc_auc_score(y, model.predict_proba(X)[:, 1]))
+    mean = np.zeros(X.shape[1])
+    std = np.zeros(X.shape[1])
+    tasks = [(feature, n_repeats, seed) for feature in range(X.shape[1])]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model, X, y, baseline)) as pool:
+        for feature, drop_mean, drop_std in pool.map(_permute_feature, tasks):
+            mean[feature], std[feature] = drop_mean, drop_std
+    return {"metric": "roc_auc", "baseline": baseline, "repeats": n_repeats,
+            "mean": mean.tolist(), "std": std.tolist()}
+
+
+def compute_importances(voting_clf, X_test, y_test, feature_names: Sequence[str],
+                        n_repeats: int = DEFAULT_REPEATS, workers: Optional[int] = None) -> Dict[str, Any]:
+    start = time.perf_counter()
+    report = {"features": list(feature_names), "model": model_importances(voting_clf), "permutation": None}
+    if n_repeats > 0:
+        report["permutation"] = permutation_importances(voting_clf, X_test, y_test, n_repeats, workers)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    logging.info(f"Feature importances computed in {report['seconds']} s")
+    return report
+
+
+def save_importances(path: str, report: Dict[str, Any]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_importances(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,221 @@
+import logging
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # Only validate_frame (training/ingest) works on DataFrames; serving does not load pandas.
+    import pandas as pd
+
+
+YES_NO = {"No": 0, "Yes": 1}
+SEX = {"Male": 1, "Female": 0}
+
+
+class Feature(NamedTuple):
+    """
+    One model input: its column name, storage dtype, the range the prediction
+    form accepts and, for radio inputs, the label -> code encoding.
+    """
+
+    name: str
+    dtype: str
+    low: float
+    high: float
+    binary: bool = False
+    labels: Optional[Dict[str, int]] = None
+
+
+# ---------------------------------------
+# Training columns, in model input order
+# ---------------------------------------
+FEATURES: List[Feature] = [
+    Feature("age", "float32", 20, 95),
+    Feature("sex", "uint8", 0, 1, binary=True, labels=SEX),
+    Feature("smoking", "uint8", 0, 1, binary=True, labels=YES_NO),
+    Feature("persistent_cough", "uint8", 0, 1, binary=True, labels=YES_NO),
+    Feature("fatigue", "uint8", 0, 1, binary=True, labels=YES_NO),
+    Feature("cough_blood", "uint8", 0, 1, binary=True, labels=YES_NO),
+    Feature("chest_pain", "uint8", 0, 1, binary=True, labels=YES_NO),
+    Feature("weight_loss", "uint8", 0, 1, binary=True, labels=YES_NO),
+    Feature("tumor_size", "float32", 0.0, 8.0),
+    Feature("alk_phosphate", "float32", 40.0, 296.0),
+    Feature("sgot", "float32", 10.0, 648.0),
+    Feature("lung_function", "float32", 0.5, 5.0),
+    Feature("tumor_marker", "float32", 0.0, 100.0),
+    Feature("histology", "uint8", 0, 1, binary=True, labels=YES_NO),
+]
+LABEL = Feature("class", "uint8", 0, 1, binary=True)
+
+FEATURE_NAMES = [f.name for f in FEATURES]
+COLUMNS = FEATURE_NAMES + [LABEL.name]
+NUMERICAL_NAMES = [f.name for f in FEATURES if not f.binary]
+DTYPES = {f.name: f.dtype for f in FEATURES + [LABEL]}
+# Bumped whenever names, dtypes or bounds change so cached datasets are rebuilt.
+SCHEMA_VERSION = 1
+
+# How out-of-range values are handled: clamp to the bound, drop the row, or fail.
+VALIDATION_POLICIES = ("clip", "drop", "raise")
+
+
+def validate_frame(df: "pd.DataFrame", policy: str = "clip",
+                   labelled: bool = True) -> Tuple["pd.DataFrame", Dict[str, Dict[str, int]]]:
+    """
+    Checks every column against its bounds in one vectorized pass per column and
+    casts to the schema dtypes. Missing values and non-0/1 flags cannot be
+    repaired, so those rows are dropped unless the policy is "raise".
+
+    With `labelled=False` (rows to score) only the feature columns are required
+    and checked, and nothing is cast: scored output keeps the input's precision
+    and other columns, e.g. patient ids, pass through unchanged.
+
+    Returns (validated frame, {column: {"out_of_range": n, "missing": n}}) for
+    columns with problems.
+    """
+    if policy not in VALIDATION_POLICIES:
+        raise ValueError(f"Unknown validation policy {policy!r}; expected one of {VALIDATION_POLICIES}")
+    if labelled and list(df.columns) != COLUMNS:
+        raise ValueError(f"Dataset columns do not match expected features. Expected: {COLUMNS}, Got: {list(df.columns)}")
+    if not labelled:
+        missing_columns = [name for name in FEATURE_NAMES if name not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Input is missing required columns: {missing_columns}")
+    checked = FEATURES + [LABEL] if labelled else FEATURES
+
+    issues: Dict[str, Dict[str, int]] = {}
+    keep = np.ones(len(df), dtype=bool)
+    clipped: Dict[str, np.ndarray] = {}
+    for feature in checked:
+        values = df[feature.name].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        if feature.binary:
+            # A flag is either 0 or 1; nothing to clip it to.
+            invalid = ~missing & (values != 0) & (values != 1)
+            out_of_range = np.zeros_like(invalid)
+        else:
+            invalid = np.zeros_like(missing)
+            out_of_range = ~missing & ((values < feature.low) | (values > feature.high))
+        n_missing, n_invalid, n_range = int(missing.sum()), int(invalid.sum()), int(out_of_range.sum())
+        if not (n_missing or n_invalid or n_range):
+            continue
+        issues[feature.name] = {"out_of_range": n_range + n_invalid, "missing": n_missing}
+        if policy == "raise":
+            raise ValueError(f"Column {feature.name!r}: {n_range + n_invalid} values outside "
+                             f"[{feature.low}, {feature.high}], {n_missing} missing")
+        keep &= ~(missing | invalid)
+        if policy == "drop":
+            keep &= ~out_of_range
+        elif n_range:
+            clipped[feature.name] = np.clip(values, feature.low, feature.high)
+
+    if clipped:
+        df = df.assign(**clipped)
+    if not keep.all():
+        df = df[keep]
+    if not labelled:
+        return df, issues
+    return df.astype(DTYPES, copy=False), issues
+
+
+def merge_issues(total: Dict[str, Dict[str, int]], issues: Dict[str, Dict[str, int]]) -> None:
+    for column, counts in issues.items():
+        entry = total.setdefault(column, {"out_of_range": 0, "missing": 0})
+        for key, value in counts.items():
+            entry[key] += value
+
+
+def log_issues(issues: Dict[str, Dict[str, int]], policy: str, source: Optional[str] = None) -> None:
+    for column, counts in issues.items():
+        logging.warning(f"{source or 'dataset'}: column {column} has {counts['out_of_range']} out-of-range and "
+                        f"{counts['missing']} missing values (policy: {policy})")
+
+
+# ---------------------------------------
+# Compiled schema for serving
+# ---------------------------------------
+class FeatureSchema:
+    """
+    FEATURES compiled into arrays, so a request is encoded, validated and
+    scaled with a few vectorized operations instead of per-value Python code.
+
+    Rows are float32, the dtype the training data is stored in. Scaling uses
+    full-width offset/scale vectors (0 and 1 for binary columns), so the whole
+    row is scaled at once without calling the scaler's transform.
+    """
+
+    def __init__(self, features: Sequence[Feature] = FEATURES):
+        self.features = list(features)
+        self.names = [f.name for f in self.features]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.low = np.array([f.low for f in self.features], dtype=np.float32)
+        self.high = np.array([f.high for f in self.features], dtype=np.float32)
+        self.binary = np.array([f.binary for f in self.features])
+        self.numerical_positions = np.flatnonzero(~self.binary)
+        self._encoders = [(i, f.name, f.labels) for i, f in enumerate(self.features)]
+        self._scaling: "weakref.WeakKeyDictionary[Any, Tuple[np.ndarray, np.ndarray]]" = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def empty(self, rows: int = 1) -> np.ndarray:
+        return np.empty((rows, len(self.features)), dtype=np.float32)
+
+    def encode(self, values: Mapping[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Writes one {column: value} record straight into a (1, n) float32 row.
+        Radio labels such as "Yes" or "Male" are mapped through the feature's
+        encoding; numbers are stored as given.
+        """
+        row = self.empty() if out is None else out
+        target = row.reshape(-1)
+        for i, name, labels in self._encoders:
+            try:
+                value = values[name]
+            except KeyError:
+                raise ValueError(f"Missing feature {name!r}")
+            if labels is not None and isinstance(value, str):
+                if value not in labels:
+                    raise ValueError(f"Feature {name!r}: unknown value {value!r}; expected one of {list(labels)}")
+                value = labels[value]
+            target[i] = value
+        return row
+
+    def as_matrix(self, rows) -> np.ndarray:
+        """Converts rows in training column order to an (n, len(schema)) float32 matrix."""
+        X = np.asarray(rows, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected an (n, {len(self.features)}) feature matrix, got shape {X.shape}")
+        return X
+
+    def validate(self, X: np.ndarray) -> None:
+        """Raises ValueError naming every column with missing, non-0/1 or out-of-range values."""
+        bad = np.isnan(X) | (X < self.low) | (X > self.high)
+        bad[:, self.binary] |= (X[:, self.binary] != 0) & (X[:, self.binary] != 1)
+        columns = np.flatnonzero(bad.any(axis=0))
+        if len(columns):
+            raise ValueError("Invalid values for " + ", ".join(
+                f"{self.names[j]} (expected {self.features[j].low:g}-{self.features[j].high:g})" for j in columns))
+
+    def scaling(self, scaler) -> Tuple[np.ndarray, np.ndarray]:
+        """Full-width (offset, scale) vectors for a fitted scaler, computed once per scaler object."""
+        cached = self._scaling.get(scaler)
+        if cached is None:
+            offset = np.zeros(len(self.features))
+            scale = np.ones(len(self.features))
+            offset[self.numerical_positions] = scaler.mean_
+            scale[self.numerical_positions] = scaler.scale_
+            cached = self._scaling[scaler] = (offset, scale)
+        return cached
+
+    def scale(self, X: np.ndarray, scaler) -> np.ndarray:
+        """Standardizes the numerical columns, returning a new float64 matrix."""
+        if scaler is None:
+            return X.astype(np.float64)
+        offset, scale = self.scaling(scaler)
+        return (X - offset) / scale
+
+
+schema = FeatureSchema()
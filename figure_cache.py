@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from metrics import metrics
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+FIGURE_CACHE_SIZE = int(os.environ.get("PULMO_FIGURE_CACHE_SIZE", 256))
+# Trace attributes holding per-point data, counted to estimate a figure's size.
+DATA_ATTRIBUTES = ("x", "y", "z", "values", "customdata")
+
+
+def figure_points(figure: "go.Figure") -> int:
+    """Data values held by all traces of `figure`, a cheap proxy for its memory footprint."""
+    points = 0
+    for trace in figure.data:
+        for name in DATA_ATTRIBUTES:
+            value = trace[name] if name in trace else None
+            if value is not None:
+                points += int(np.size(value))
+    return points
+
+
+class CachedFigure:
+    """A built figure with its build time and data point count."""
+
+    __slots__ = ("figure", "points", "build_ms")
+
+    def __init__(self, figure: "go.Figure", points: int, build_ms: float):
+        self.figure = figure
+        self.points = points
+        self.build_ms = build_ms
+
+
+class FigureCache:
+    """
+    Process-wide LRU of built Plotly figures, shared by every session.
+
+    Keys identify everything a figure depends on, e.g. (chart name, dataset
+    hash, model version), so a new dataset or model never serves a stale chart;
+    old entries simply age out. Cached figures must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CachedFigure]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._building: Dict[Tuple[Hashable, ...], threading.Lock] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "build_ms": 0.0}
+
+    def get(self, key: Tuple[Hashable, ...], builder: Callable[[], "go.Figure"]) -> CachedFigure:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        # Concurrent sessions asking for the same chart wait for one build.
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.stats["hits"] += 1
+                    return entry
+            start = time.perf_counter()
+            try:
+                figure = builder()
+            except Exception:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            entry = CachedFigure(figure, figure_points(figure), (time.perf_counter() - start) * 1000)
+            metrics.observe("pulmo_figure_build_seconds", entry.build_ms / 1000, chart=key[0])
+            with self._lock:
+                self.stats["misses"] += 1
+                self.stats["build_ms"] += entry.build_ms
+                self._entries[key] = entry
+                self._building.pop(key, None)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+            logging.info(f"Built figure {key[0]} in {entry.build_ms:.1f} ms ({entry.points} data points)")
+            return entry
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drops every entry, or only those for chart `name`."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == name]:
+                    del self._entries[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries),
+                    "points": sum(e.points for e in self._entries.values())}
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(key: Tuple[Hashable, ...], builder: Callable[[], "go.Figure"]) -> "go.Figure":
+    """Returns the shared figure for `key`, building it with `builder` on first use."""
+    return figure_cache.get(key, builder).figure
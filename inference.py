@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from feature_schema import schema
+
+# ---------------------------------------
+# Shared inference helpers (no Streamlit dependency)
+# ---------------------------------------
+prediction_label = {0: "Low Risk", 1: "High Risk"}
+EXPECTED_FEATURES = len(schema)
+# A patient is labelled High Risk when P(High Risk) is strictly above this value.
+DECISION_THRESHOLD = float(os.environ.get("PULMO_DECISION_THRESHOLD", "0.5"))
+
+
+def preprocess_batch(features, scaler):
+    """
+    Scales the numerical columns of an (n, 14) feature matrix in one vectorized pass.
+    """
+    return schema.scale(schema.as_matrix(features), scaler)
+
+
+def labels_from_proba(proba, threshold: float = None):
+    """
+    Derives class labels from a predict_proba matrix.
+
+    With the default threshold of 0.5 this matches `model.predict` for the soft-voting ensemble.
+    """
+    threshold = DECISION_THRESHOLD if threshold is None else threshold
+    return (np.asarray(proba)[:, 1] > threshold).astype(np.int64)
+
+
+def score_batch(model, features, threshold: float = None):
+    """
+    Scores preprocessed features with a single predict_proba pass.
+
+    Returns (labels, proba).
+    """
+    proba = model.predict_proba(features)
+    return labels_from_proba(proba, threshold), proba
+
+
+def risk_probabilities(proba_row):
+    """Maps one probability row to percentages keyed by risk label."""
+    return {
+        prediction_label[1]: round(float(proba_row[1]) * 100, 1),
+        prediction_label[0]: round(float(proba_row[0]) * 100, 1),
+    }
@@ -0,0 +1,299 @@
+"""
+Standalone HTTP/JSON prediction service with request micro-batching.
+
+Usage:
+    python -m inference_server [--host 127.0.0.1] [--port 8502] [--window-ms 5] [--max-batch 64]
+
+Endpoints:
+    POST /predict   {"features": [14 values]} or {"age": ..., "sex": ..., ...}
+    GET  /health    503 until the model is loaded and warmed up, then 200
+    GET  /metrics   Prometheus text format
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from inference import DECISION_THRESHOLD, EXPECTED_FEATURES, labels_from_proba, prediction_label, preprocess_batch
+from feature_schema import schema
+from logging_setup import configure_logging
+from metrics import STAGE_SECONDS, metrics, start_trace
+from model_registry import MODEL_PATH, SCALER_PATH, get_model_and_scaler, model_version
+from prediction_cache import prediction_cache
+from warmup import warmup
+
+DEFAULT_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 64
+MAX_BODY_BYTES = 64 * 1024
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-patient requests and scores them together.
+
+    The first queued request opens a batch; the batch is flushed when it reaches
+    `max_batch_size` rows or `window_ms` milliseconds have passed, whichever is first.
+    Scoring, model version checks and prediction cache reads/writes run on a dedicated
+    worker thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, scaler_path: str = SCALER_PATH,
+                 window_ms: float = DEFAULT_WINDOW_MS, max_batch_size: int = DEFAULT_MAX_BATCH):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer")
+        self.stats = {"requests": 0, "batches": 0, "max_batch_seen": 0}
+
+    def score(self, rows: List[np.ndarray]) -> Tuple[np.ndarray, Optional[str]]:
+        """Scores validated (1, 14) rows with one predict_proba call."""
+        with metrics.time(STAGE_SECONDS, pipeline="server_batch", stage="model_fetch"):
+            model, scaler = get_model_and_scaler(self.model_path, self.scaler_path)
+        with metrics.time(STAGE_SECONDS, pipeline="server_batch", stage="preprocess"):
+            X = preprocess_batch(np.concatenate(rows) if len(rows) > 1 else rows[0], scaler)
+        with metrics.time(STAGE_SECONDS, pipeline="server_batch", stage="predict_proba"):
+            proba = model.predict_proba(X)
+        version = model_version(self.model_path)
+        for row, row_proba in zip(rows, proba):
+            prediction_cache.put(row, version, row_proba)
+        return proba, version
+
+    def lookup(self, row: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """Cached probabilities for `row` under the current model version (None on a miss)."""
+        version = model_version(self.model_path)
+        return prediction_cache.get(row, version), version
+
+    async def cached(self, row: np.ndarray):
+        """Runs lookup() on the scoring thread so a version check or hot-swap reload never blocks the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.lookup, row)
+
+    async def submit(self, row: np.ndarray):
+        """Queues one feature row and waits for its probabilities."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def run(self):
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            rows = [row for row, _ in batch]
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+            try:
+                proba, version = await loop.run_in_executor(self._executor, self.score, rows)
+            except Exception as e:
+                logging.error(f"Batch scoring failed for {len(batch)} requests: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result((proba[i], version))
+
+
+def parse_features(payload) -> np.ndarray:
+    """
+    Accepts either {"features": [...]} in training column order or a {column: value}
+    mapping and returns one validated (1, 14) float32 row.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    if "features" in payload:
+        values = payload["features"]
+        if not isinstance(values, list) or len(values) != EXPECTED_FEATURES:
+            raise ValueError(f"'features' must be a list of {EXPECTED_FEATURES} numbers")
+        if any(isinstance(v, (bool, str)) or v is None for v in values):
+            raise ValueError("All feature values must be numeric")
+        try:
+            row = schema.as_matrix(values)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"All feature values must be numeric: {e}")
+    else:
+        missing = [col for col in schema.names if col not in payload]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        try:
+            row = schema.encode(payload)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"All feature values must be numeric: {e}")
+    schema.validate(row)
+    return row
+
+
+class InferenceServer:
+    """Minimal asyncio HTTP/1.1 server exposing the micro-batched model."""
+
+    def __init__(self, batcher: MicroBatcher, threshold: float = DECISION_THRESHOLD):
+        self.batcher = batcher
+        self.threshold = threshold
+        self.started_at = time.time()
+
+    async def handle_predict(self, body: bytes):
+        trace = start_trace("server")
+        try:
+            with trace.span("parse"):
+                row = parse_features(json.loads(body or b"null"))
+        except (ValueError, json.JSONDecodeError) as e:
+            trace.finish("invalid")
+            return 400, {"error": str(e)}
+        with trace.span("cache_lookup"):
+            proba, version = await self.batcher.cached(row)
+        if proba is None:
+            try:
+                with trace.span("score"):
+                    proba, version = await self.batcher.submit(row)
+            except Exception:
+                trace.finish("error")
+                raise
+        trace.finish(model_version=version)
+        label = int(labels_from_proba(proba.reshape(1, -1), self.threshold)[0])
+        return 200, {
+            "prediction": prediction_label[label],
+            "class": label,
+            "probabilities": {prediction_label[0]: float(proba[0]), prediction_label[1]: float(proba[1])},
+            "model_version": version,
+        }
+
+    async def route(self, method: str, path: str, body: bytes):
+        if path == "/health":
+            if not warmup.ready:
+                return 503, {"status": "failed" if warmup.state == "failed" else "warming",
+                             "warmup": warmup.snapshot()}
+            return 200, {"status": "ok", "uptime_seconds": round(time.time() - self.started_at, 1),
+                         "warmup": warmup.snapshot(), "batching": self.batcher.stats,
+                         "prediction_cache": prediction_cache.snapshot()}
+        if path == "/metrics":
+            return 200, metrics.render_prometheus()
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "Use POST"}
+            if not warmup.ready:
+                return 503, {"error": f"Model is not ready ({warmup.state})"}
+            return await self.handle_predict(body)
+        return 404, {"error": f"No route for {path}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    status, payload = await self.route(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    logging.error(f"Error handling {method} {path}: {e}")
+                    status, payload = 500, {"error": "Internal server error"}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        """Sends `payload` as JSON, or as plain text when it is already a string."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, batcher: MicroBatcher, threshold: float = DECISION_THRESHOLD):
+    server = InferenceServer(batcher, threshold)
+    batch_task = asyncio.create_task(batcher.run())
+    http = await asyncio.start_server(server.handle_connection, host, port)
+    logging.info(f"Inference server listening on http://{host}:{port}")
+    print(f"Inference server listening on http://{host}:{port}")
+    async with http:
+        try:
+            await http.serve_forever()
+        finally:
+            batch_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m inference_server", description="Serve lung cancer risk predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--model", default=MODEL_PATH, help="Path to the trained model")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="Path to the fitted scaler")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS,
+                        help="How long to wait for more requests before scoring a batch")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Maximum rows per predict_proba call")
+    parser.add_argument("--threshold", type=float, default=DECISION_THRESHOLD,
+                        help="Label a request High Risk when P(High Risk) is above this value")
+    parser.add_argument("--log-file", default="inference_server.log", help="Rotating log file")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_file)
+
+    batcher = MicroBatcher(args.model, args.scaler, args.window_ms, args.max_batch)
+    # The port opens straight away so probes can see the warm-up; /health turns 200 once it is done.
+    warmup.start(model_path=args.model, scaler_path=args.scaler, data_path=None)
+    try:
+        asyncio.run(serve(args.host, args.port, batcher, args.threshold))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Chunked CSV ingestion into a validated, memory-mappable columnar cache.
+
+Usage:
+    python -m ingest data/lung_cancer_new.csv [--policy clip|drop|raise] [--chunksize 100000]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import (COLUMNS, DTYPES, SCHEMA_VERSION, VALIDATION_POLICIES, log_issues, merge_issues,
+                            validate_frame)
+from model_registry import file_digest
+
+DEFAULT_CHUNKSIZE = 100_000
+META_FILE = "meta.json"
+
+
+def cache_dir_for(path: str) -> str:
+    """data/lung_cancer_new.csv is cached in data/lung_cancer_new.columnar/."""
+    return os.path.splitext(path)[0] + ".columnar"
+
+
+def iter_validated_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                          policy: str = "clip") -> Iterator[Tuple[pd.DataFrame, Dict[str, Dict[str, int]], int]]:
+    """Yields (validated chunk, issues, rows read) triples, parsing at most `chunksize` rows at a time."""
+    # Parse flags straight into compact dtypes where possible; columns with
+    # missing values fall back to float and are cleaned up by validation.
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype={name: "float32" for name in COLUMNS}):
+        validated, issues = validate_frame(chunk, policy)
+        yield validated, issues, len(chunk)
+
+
+class ColumnarDataset:
+    """
+    A validated dataset stored as one raw binary file per column.
+
+    Columns are memory-mapped, so opening the dataset costs nothing and batches
+    can be read without loading the rest of the file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode="r", shape=(self.rows,))
+            if self.rows else np.empty(0, dtype=dtype)
+            for name, dtype in self.meta["dtypes"].items()
+        }
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Loads the selected columns (all by default) into a DataFrame with the compact dtypes."""
+        return pd.DataFrame({name: np.asarray(self.columns[name]) for name in (columns or COLUMNS)})
+
+    def iter_batches(self, batch_size: int, columns: Optional[Sequence[str]] = None,
+                     indices: Optional[np.ndarray] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Yields {column: array} batches of at most `batch_size` rows, optionally restricted to `indices`."""
+        names = list(columns or COLUMNS)
+        total = self.rows if indices is None else len(indices)
+        for start in range(0, total, batch_size):
+            if indices is None:
+                yield {name: np.asarray(self.columns[name][start:start + batch_size]) for name in names}
+            else:
+                idx = indices[start:start + batch_size]
+                yield {name: self.columns[name][idx] for name in names}
+
+
+def _source_state(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _is_current(meta: dict, path: str, policy: str) -> bool:
+    if meta.get("schema_version") != SCHEMA_VERSION or meta.get("policy") != policy:
+        return False
+    if meta.get("source_state") == _source_state(path):
+        return True
+    # Touched or copied: trust the cache only if the content is unchanged.
+    return meta.get("source_sha256") == file_digest(path)
+
+
+def ingest_csv(path: str, cache_dir: Optional[str] = None, chunksize: int = DEFAULT_CHUNKSIZE,
+               policy: str = "clip") -> ColumnarDataset:
+    """
+    Streams `path` through schema validation into a fresh columnar cache. Peak
+    memory is one chunk; the cache directory is swapped in only when complete.
+    """
+    cache_dir = cache_dir or cache_dir_for(path)
+    tmp_dir = f"{cache_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    start = time.perf_counter()
+    state = _source_state(path)
+    rows, source_rows, issues = 0, 0, {}
+    files = {name: open(os.path.join(tmp_dir, f"{name}.bin"), "wb") for name in COLUMNS}
+    try:
+        for chunk, chunk_issues, chunk_rows in iter_validated_chunks(path, chunksize, policy):
+            source_rows += chunk_rows
+            rows += len(chunk)
+            merge_issues(issues, chunk_issues)
+            for name, f in files.items():
+                chunk[name].to_numpy().tofile(f)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {
+        "schema_version": SCHEMA_VERSION,
+        "source": os.path.abspath(path),
+        "source_sha256": file_digest(path),
+        "source_state": state,
+        "source_rows": source_rows,
+        "rows": rows,
+        "policy": policy,
+        "issues": issues,
+        "dtypes": {name: DTYPES[name] for name in COLUMNS},
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+    log_issues(issues, policy, path)
+    logging.info(f"Ingested {rows} of {source_rows} rows from {path} into {cache_dir} in {meta['seconds']} s")
+    return ColumnarDataset(cache_dir)
+
+
+def load_dataset(path: str, cache_dir: Optional[str] = None, chunksize: int = DEFAULT_CHUNKSIZE,
+                 policy: str = "clip", refresh: bool = False) -> ColumnarDataset:
+    """Opens the columnar cache for `path`, (re)building it only if the CSV, schema or policy changed."""
+    cache_dir = cache_dir or cache_dir_for(path)
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if not refresh and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if _is_current(meta, path, policy):
+            logging.info(f"Using columnar cache {cache_dir} ({meta['rows']} rows)")
+            return ColumnarDataset(cache_dir)
+    return ingest_csv(path, cache_dir, chunksize, policy)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m ingest", description="Validate a dataset CSV into a columnar cache.")
+    parser.add_argument("csv", help="Dataset CSV with the training columns")
+    parser.add_argument("--cache-dir", default=None, help="Output directory (default: <csv name>.columnar)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows parsed per chunk")
+    parser.add_argument("--policy", choices=VALIDATION_POLICIES, default="clip",
+                        help="How to handle values outside the prediction form's bounds")
+    args = parser.parse_args(argv)
+    dataset = ingest_csv(args.csv, args.cache_dir, args.chunksize, args.policy)
+    print(json.dumps({key: dataset.meta[key] for key in ("rows", "source_rows", "issues", "seconds")}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Shared, non-blocking logging configuration.
+
+Log calls only put the record on a bounded in-memory queue; a background
+QueueListener thread formats it and writes it to a rotating file. When the
+queue is full, records are dropped and counted instead of blocking the caller.
+
+Environment:
+    PULMO_LOG_FORMAT         json (default) or text
+    PULMO_LOG_MAX_BYTES      rotate when the file reaches this size (default 5 MB)
+    PULMO_LOG_BACKUPS        rotated files kept (default 5)
+    PULMO_LOG_ROTATE_WHEN    time-based rotation instead, e.g. "midnight" or "H"
+    PULMO_LOG_SAMPLE_RATES   per-logger sampling, e.g. "pulmo.payload=0.01,pulmo.trace=0.1"
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from typing import Dict, Optional
+
+LOG_FORMAT = os.environ.get("PULMO_LOG_FORMAT", "json")
+LOG_MAX_BYTES = int(os.environ.get("PULMO_LOG_MAX_BYTES", 5 * 1024 * 1024))
+LOG_BACKUPS = int(os.environ.get("PULMO_LOG_BACKUPS", 5))
+LOG_ROTATE_WHEN = os.environ.get("PULMO_LOG_ROTATE_WHEN", "")
+LOG_QUEUE_SIZE = int(os.environ.get("PULMO_LOG_QUEUE_SIZE", 10000))
+# Loggers for high-volume payload dumps (feature vectors, probabilities); only a sample is kept.
+PAYLOAD_LOGGER = "pulmo.payload"
+DEFAULT_SAMPLE_RATES = {PAYLOAD_LOGGER: 0.01}
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through `extra=`.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a random `rate` fraction of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records that do not fit in the queue are counted and dropped."""
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def _file_handler(filename: str) -> logging.Handler:
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(filename, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUPS,
+                                                         encoding="utf-8", delay=True)
+    return logging.handlers.RotatingFileHandler(filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                                encoding="utf-8", delay=True)
+
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(filename: str, level: int = logging.INFO, log_format: str = LOG_FORMAT,
+                      sample_rates: Optional[Dict[str, float]] = None) -> None:
+    """
+    Routes the root logger through a background writer for `filename`.
+    Safe to call on every Streamlit rerun: only the first call has an effect.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        file_handler = _file_handler(filename)
+        file_handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+        _queue_handler = DroppingQueueHandler(log_queue)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+        rates = dict(DEFAULT_SAMPLE_RATES)
+        rates.update(sample_rates if sample_rates is not None
+                     else parse_sample_rates(os.environ.get("PULMO_LOG_SAMPLE_RATES", "")))
+        for name, rate in rates.items():
+            logger = logging.getLogger(name)
+            logger.setLevel(logging.DEBUG)
+            logger.addFilter(SamplingFilter(rate))
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Writes out every queued record and stops the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        dropped = dropped_records()
+        for handler in _listener.handlers:
+            if dropped:
+                handler.handle(logging.makeLogRecord({"name": "root", "levelno": logging.WARNING,
+                                                      "levelname": "WARNING",
+                                                      "msg": f"{dropped} log records were dropped (queue full)"}))
+            handler.close()
+        _listener = None
+        logging.getLogger().removeHandler(_queue_handler)
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
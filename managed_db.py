@@ -1,18 +1,199 @@
+import logging
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
 
-def create_usertable():
-    # Create a new database connection within the current thread
-    conn = sqlite3.connect("usersdata.db")
-    
-    # Create a cursor for this thread
-    c = conn.cursor()
+# ---------------------------------------
+# Configure File Paths
+# ---------------------------------------
+BASE_DIR = os.path.dirname(__file__)
+USERS_DB_PATH = os.path.join(BASE_DIR, "usersdata.db")
 
-    # Define and execute the SQL command to create the user table
-    c.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
+PRAGMAS = ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA busy_timeout=5000")
+# Compiled statements kept per connection; every query below is a constant string, so each is prepared once per connection.
+CACHED_STATEMENTS = 64
+# Connections open at most per database file, shared by every thread.
+POOL_SIZE = int(os.environ.get("PULMO_DB_POOL_SIZE", 4))
+POOL_TIMEOUT = 30.0
 
-    # Commit the changes and close the connection
-    conn.commit()
-    conn.close()
+SELECT_PASSWORD_SQL = "SELECT password FROM userstable WHERE username = ?"
+INSERT_USER_SQL = "INSERT INTO userstable (username, password) VALUES (?, ?)"
+UPDATE_PASSWORD_SQL = "UPDATE userstable SET password = ? WHERE username = ?"
 
-# Call the function to create the user table
-create_usertable()
+
+class ConnectionPool:
+    """
+    At most `size` long-lived SQLite connections for a single database file.
+
+    A connection is checked out for one query or transaction and handed back
+    afterwards, so the number of open files does not grow with the number of
+    threads (Streamlit starts a new script thread on every rerun). When every
+    connection is in use, callers wait up to `timeout` seconds for one.
+    """
+
+    def __init__(self, path: str, pragmas=PRAGMAS, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.pragmas = pragmas
+        self.size = size
+        self.timeout = timeout
+        # LIFO keeps the most recently used connections (and their statement caches) busy.
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No free connection to {self.path} after {self.timeout:g}s "
+                                           f"(pool size {self.size})")
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Checks out a connection for the duration of the block; any open transaction is rolled back on return."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """A checked-out connection whose writes are committed when the block succeeds."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def close_all(self):
+        """Closes the idle connections; connections checked out right now are closed by later calls."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str = USERS_DB_PATH) -> ConnectionPool:
+    """Returns the process-wide pool for `path`."""
+    key = os.path.realpath(path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, ConnectionPool(path))
+    return pool
+
+
+# ---------------------------------------
+# Schema Migrations (tracked with PRAGMA user_version)
+# ---------------------------------------
+def _migrate_userstable_v1(conn: sqlite3.Connection):
+    """
+    Creates userstable with a primary key. Older databases created by the
+    first version of this module have no key and may hold duplicate usernames;
+    those are rebuilt keeping one row per user, preferring the newest bcrypt hash.
+    """
+    columns = conn.execute("PRAGMA table_info(userstable)").fetchall()
+    if not columns:
+        conn.execute("CREATE TABLE userstable(username TEXT PRIMARY KEY, password BLOB NOT NULL)")
+        return
+    if any(col[5] for col in columns):
+        return
+    conn.execute("CREATE TABLE userstable_new(username TEXT PRIMARY KEY, password BLOB NOT NULL)")
+    conn.execute("""
+        INSERT INTO userstable_new (username, password)
+        SELECT username, password FROM userstable AS u
+        WHERE u.rowid = (
+            SELECT v.rowid FROM userstable AS v WHERE v.username = u.username
+            ORDER BY typeof(v.password) = 'blob' DESC, v.rowid DESC LIMIT 1
+        ) AND username IS NOT NULL AND password IS NOT NULL
+    """)
+    conn.execute("DROP TABLE userstable")
+    conn.execute("ALTER TABLE userstable_new RENAME TO userstable")
+
+
+MIGRATIONS = [_migrate_userstable_v1]
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def migrate(path: str = USERS_DB_PATH):
+    """Applies pending schema migrations once per process."""
+    key = os.path.realpath(path)
+    if key in _migrated:
+        return
+    with _migrate_lock:
+        if key in _migrated:
+            return
+        with get_pool(path).connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+                # DDL is not wrapped implicitly by sqlite3, so open the transaction explicitly.
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    step(conn)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                logging.info(f"Migrated {path} to schema version {target}")
+        _migrated.add(key)
+
+
+# ---------------------------------------
+# User Queries
+# ---------------------------------------
+def get_password_hash(username: str, path: str = USERS_DB_PATH) -> Optional[bytes]:
+    with get_pool(path).connection() as conn:
+        row = conn.execute(SELECT_PASSWORD_SQL, (username,)).fetchone()
+    return row[0] if row else None
+
+
+def insert_user(username: str, hashed_password: bytes, path: str = USERS_DB_PATH):
+    """Inserts a user; raises sqlite3.IntegrityError if the username is taken."""
+    with get_pool(path).transaction() as conn:
+        conn.execute(INSERT_USER_SQL, (username, hashed_password))
+
+
+def update_password(username: str, hashed_password: bytes, path: str = USERS_DB_PATH):
+    with get_pool(path).transaction() as conn:
+        conn.execute(UPDATE_PASSWORD_SQL, (hashed_password, username))
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,271 @@
+"""
+In-process latency histograms, counters and gauges with Prometheus text exposition.
+
+Every stage observation goes into a histogram; full per-request traces are
+only logged for a sampled fraction of requests (PULMO_TRACE_SAMPLE_RATE).
+Set PULMO_METRICS_FILE to have the metrics written there periodically, e.g.
+for node_exporter's textfile collector; inference_server serves GET /metrics.
+"""
+import bisect
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+TRACE_SAMPLE_RATE = float(os.environ.get("PULMO_TRACE_SAMPLE_RATE", "0.01"))
+METRICS_FILE = os.environ.get("PULMO_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("PULMO_METRICS_INTERVAL", "15"))
+
+STAGE_SECONDS = "pulmo_stage_seconds"
+HELP = {
+    STAGE_SECONDS: "Latency of one prediction pipeline stage",
+    "pulmo_figure_build_seconds": "Time to build a chart that was not in the figure cache",
+    "pulmo_requests_total": "Prediction requests by pipeline and outcome",
+    "pulmo_prediction_cache_total": "Prediction cache lookups by result",
+    "pulmo_credential_job_seconds": "Time a bcrypt job spent running in the credential pool",
+    "pulmo_credential_rejected_total": "bcrypt jobs turned away because the credential pool was full",
+    "pulmo_credential_queue_depth": "bcrypt jobs waiting for a credential pool worker",
+    "pulmo_credential_in_flight": "bcrypt jobs currently running",
+}
+# Cumulative buckets exported to Prometheus; quantiles come from the finer internal buckets.
+EXPORT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.9, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Log-linear latency histogram (HDR-style): `sub_buckets` buckets per power
+    of two between `min_value` and `max_value`, so any quantile is reported
+    within about 2 ** (1 / sub_buckets) - 1 (9% for 8) of the true value,
+    in constant memory.
+    """
+
+    def __init__(self, min_value: float = 1e-6, max_value: float = 1e3, sub_buckets: int = 8):
+        self.min_value = min_value
+        self.sub_buckets = sub_buckets
+        self.counts = [0] * (int(math.ceil(math.log2(max_value / min_value) * sub_buckets)) + 1)
+        self.export_counts = [0] * (len(EXPORT_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = int(math.log2(value / self.min_value) * self.sub_buckets) if value > self.min_value else 0
+        index = min(index, len(self.counts) - 1)
+        export_index = bisect.bisect_left(EXPORT_BUCKETS, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.export_counts[export_index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 when empty)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target and count:
+                    return min(self.min_value * 2 ** ((index + 1) / self.sub_buckets), self.max)
+            return self.max
+
+    def cumulative(self) -> List[int]:
+        with self._lock:
+            totals, seen = [], 0
+            for count in self.export_counts:
+                seen += count
+                totals.append(seen)
+            return totals
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Metrics:
+    """Process-wide registry of labelled histograms, counters and gauges."""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, _labels(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, read: Callable[[], float], **labels) -> None:
+        """Registers a gauge whose value is read from `read()` each time metrics are exported."""
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = read
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, gauges and p50/p90/p99 per histogram, for JSON status endpoints."""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+        return {
+            "histograms": [{"name": name, "labels": dict(labels), "count": h.count, "sum": round(h.sum, 6),
+                            **{f"p{int(q * 100)}": round(h.quantile(q), 6) for q in QUANTILES}}
+                           for (name, labels), h in histograms],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters],
+            "gauges": [{"name": name, "labels": dict(labels), "value": read()} for (name, labels), read in gauges],
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items(), key=lambda item: item[0])
+        lines = []
+        described = set()
+
+        def header(name: str, kind: str):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), h in histograms:
+            header(name, "histogram")
+            for bound, total in zip(list(EXPORT_BUCKETS) + ["+Inf"], h.cumulative()):
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(bound)))} {total}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h.sum:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+        for (name, labels), h in histograms:
+            header(f"{name}_quantile", "gauge")
+            for q in QUANTILES:
+                lines.append(f"{name}_quantile{_format_labels(labels, ('quantile', str(q)))} {h.quantile(q):.6f}")
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), read in gauges:
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {read():g}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+
+
+# ---------------------------------------
+# Sampled request traces
+# ---------------------------------------
+class Trace:
+    """
+    Times the stages of one request. Every stage is recorded in the
+    `pulmo_stage_seconds` histogram; the trace itself is logged as one JSON
+    line only when the request was sampled.
+    """
+
+    def __init__(self, pipeline: str, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.pipeline = pipeline
+        self.sampled = random.random() < sample_rate
+        self.spans: List[Tuple[str, float, float]] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe(STAGE_SECONDS, elapsed, pipeline=self.pipeline, stage=stage)
+            if self.sampled:
+                self.spans.append((stage, start - self._start, elapsed))
+
+    def finish(self, outcome: str = "ok", **attributes) -> None:
+        metrics.inc("pulmo_requests_total", pipeline=self.pipeline, outcome=outcome)
+        if not self.sampled:
+            return
+        logging.info("trace " + json.dumps({
+            "trace_id": uuid.uuid4().hex[:16], "pipeline": self.pipeline, "outcome": outcome,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "spans": [{"stage": stage, "offset_ms": round(offset * 1000, 3), "ms": round(elapsed * 1000, 3)}
+                      for stage, offset, elapsed in self.spans],
+            **attributes,
+        }))
+
+
+def start_trace(pipeline: str) -> Trace:
+    return Trace(pipeline)
+
+
+# ---------------------------------------
+# Textfile export
+# ---------------------------------------
+_exporter_lock = threading.Lock()
+_exporter: Optional[threading.Thread] = None
+
+
+def start_textfile_exporter(path: str = METRICS_FILE, interval: float = METRICS_INTERVAL) -> None:
+    """Rewrites `path` every `interval` seconds from a daemon thread; a no-op without a path or if already running."""
+    global _exporter
+    if not path:
+        return
+    with _exporter_lock:
+        if _exporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    metrics.write_textfile(path)
+                except OSError as e:
+                    logging.warning(f"Could not write metrics to {path}: {e}")
+
+        _exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        _exporter.start()
@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import joblib
+
+from fast_predictor import HEADER_FILE, load_compact
+
+# ---------------------------------------
+# Configure File Paths
+# ---------------------------------------
+# train_model.py writes here and every entry point reads from here: models/ under the
+# working directory unless PULMO_MODEL_DIR is set.
+MODEL_DIR = os.environ.get("PULMO_MODEL_DIR", "models")
+MODEL_PATH = os.path.join(MODEL_DIR, "voting_model.pkl")
+SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Entry:
+    """A loaded artifact together with the file state it was loaded from."""
+
+    __slots__ = ("obj", "mtime_ns", "size", "digest", "loaded_at")
+
+    def __init__(self, obj, mtime_ns, size, digest):
+        self.obj = obj
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of deserialized artifacts.
+
+    Each artifact is loaded once and kept in memory. Every lookup stats the
+    file; when its mtime or size changes the content hash is recomputed and,
+    if it differs, the new version is loaded and swapped in atomically.
+    """
+
+    def __init__(self, loader: Callable[[str], Any] = joblib.load):
+        self._loader = loader
+        self._entries: Dict[str, _Entry] = {}
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0, "load_seconds": 0.0}
+
+    def get(self, path: str, loader: Optional[Callable[[str], Any]] = None) -> Any:
+        """Returns the artifact stored at `path`, loading or reloading it if needed."""
+        key = os.path.realpath(path)
+        st = os.stat(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            self.stats["hits"] += 1
+            return entry.obj
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                self.stats["hits"] += 1
+                return entry.obj
+
+            digest = file_digest(key)
+            if entry is not None and entry.digest == digest:
+                # Touched but unchanged: keep the loaded object.
+                entry.mtime_ns, entry.size = st.st_mtime_ns, st.st_size
+                self.stats["hits"] += 1
+                return entry.obj
+
+            self.stats["misses"] += 1
+            start = time.perf_counter()
+            obj = (loader or self._loader)(key)
+            elapsed = time.perf_counter() - start
+            self.stats["load_seconds"] += elapsed
+            self._entries[key] = _Entry(obj, st.st_mtime_ns, st.st_size, digest)
+            if entry is not None:
+                self.stats["reloads"] += 1
+                logging.info(f"Reloaded {key} (version {digest[:12]}) in {elapsed * 1000:.1f} ms")
+                for listener in list(self._listeners):
+                    listener(key, digest)
+            else:
+                logging.info(f"Loaded {key} (version {digest[:12]}) in {elapsed * 1000:.1f} ms")
+            return obj
+
+    def digest(self, path: str) -> str:
+        """Content hash of the file at `path` without loading it; rehashed only when its mtime or size changes."""
+        key = os.path.realpath(path)
+        st = os.stat(key)
+        cached = self._digests.get(key)
+        if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+            cached = (st.st_mtime_ns, st.st_size, file_digest(key))
+            self._digests[key] = cached
+        return cached[2]
+
+    def version(self, path: str) -> Optional[str]:
+        """Returns the content hash of the loaded artifact, or None if not loaded."""
+        entry = self._entries.get(os.path.realpath(path))
+        return entry.digest if entry else None
+
+    def on_swap(self, callback: Callable[[str, str], None]) -> None:
+        """Registers `callback(path, digest)` to run whenever an artifact is hot-swapped."""
+        self._listeners.append(callback)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drops one cached artifact, or all of them, forcing a reload on next access."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.realpath(path), None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns counters and the versions currently held in memory."""
+        return {
+            **self.stats,
+            "artifacts": {
+                path: {"version": e.digest[:12], "loaded_at": e.loaded_at}
+                for path, e in self._entries.items()
+            },
+        }
+
+
+registry = ModelRegistry()
+
+
+def compact_header_path(model_path: str = MODEL_PATH) -> Optional[str]:
+    """
+    Returns the header of the compact export that sits next to `model_path`
+    (models/voting_model/ for models/voting_model.pkl), or None if there is none.
+    """
+    header = os.path.join(os.path.splitext(model_path)[0], HEADER_FILE)
+    return header if os.path.exists(header) else None
+
+
+_stale_exports = set()
+
+
+def _current_compact(model_path: str) -> Optional[Tuple[str, Tuple[Any, Any]]]:
+    """
+    Returns (header path, (predictor, scaler)) when the compact export next to
+    `model_path` was compiled from the pickle currently on disk. An export
+    without that hash, or from an older pickle, is only used if the pickle is gone.
+    """
+    header = compact_header_path(model_path)
+    if header is None:
+        return None
+    compact = registry.get(header, loader=load_compact)
+    if not os.path.exists(model_path):
+        return header, compact
+    source = getattr(compact[0], "source_sha256", None)
+    if source is not None and source == registry.digest(model_path):
+        if compact[0].fallback is None:
+            # Large batches score faster through sklearn; the pickle is loaded on first use.
+            compact[0].fallback = lambda: registry.get(model_path) if os.path.exists(model_path) else None
+        return header, compact
+    if header not in _stale_exports:
+        _stale_exports.add(header)
+        logging.warning(f"Compact export {header} does not match {model_path}; serving the pickle")
+    return None
+
+
+def get_model_and_scaler(model_path: str = MODEL_PATH, scaler_path: str = SCALER_PATH) -> Tuple[Any, Any]:
+    """
+    Returns the shared model and scaler.
+
+    A memory-mapped compact export is preferred when it was compiled from the
+    current pickle; otherwise the pickles are used and the scaler is None if
+    its file is missing.
+    """
+    current = _current_compact(model_path)
+    if current:
+        return current[1]
+    model = registry.get(model_path)
+    scaler = registry.get(scaler_path) if os.path.exists(scaler_path) else None
+    return model, scaler
+
+
+def model_version(model_path: str = MODEL_PATH) -> Optional[str]:
+    """Short content hash identifying the model currently served."""
+    current = _current_compact(model_path) if compact_header_path(model_path) else None
+    digest = registry.version(current[0] if current else model_path)
+    return digest[:12] if digest else None
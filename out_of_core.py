@@ -0,0 +1,153 @@
+import logging
+import time
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import VotingClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.utils import Bunch
+
+from feature_schema import FEATURE_NAMES, LABEL, NUMERICAL_NAMES
+
+NUMERICAL_POSITIONS = [FEATURE_NAMES.index(name) for name in NUMERICAL_NAMES]
+DEFAULT_BATCH_ROWS = 50_000
+DEFAULT_SAMPLE_ROWS = 200_000
+DEFAULT_TREE_ROWS = 50_000
+DEFAULT_EVAL_ROWS = 100_000
+DEFAULT_EPOCHS = 5
+
+
+def row_hash(start: int, count: int, seed: int) -> np.ndarray:
+    """
+    Deterministic uniform [0, 1) value per row index (splitmix64). Splits and
+    samples derived from it do not depend on batch size or iteration order.
+    """
+    with np.errstate(over="ignore"):
+        z = np.arange(start, start + count, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class BottomKSample:
+    """
+    Uniform sample of at most `k` rows from a stream: every row carries a
+    random key and the rows with the `k` smallest keys are kept.
+    """
+
+    def __init__(self, k: int, n_features: int):
+        self.k = k
+        self.X = np.empty((0, n_features), dtype=np.float32)
+        self.y = np.empty(0, dtype=np.uint8)
+        self.keys = np.empty(0, dtype=np.float64)
+
+    def add(self, X: np.ndarray, y: np.ndarray, keys: np.ndarray):
+        if not len(keys):
+            return
+        X = np.concatenate([self.X, X])
+        y = np.concatenate([self.y, y])
+        keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.k:
+            keep = np.argpartition(keys, self.k - 1)[:self.k]
+            X, y, keys = X[keep], y[keep], keys[keep]
+        self.X, self.y, self.keys = X, y, keys
+
+
+def _batch_matrix(batch: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    X = np.empty((len(batch[LABEL.name]), len(FEATURE_NAMES)), dtype=np.float32)
+    for j, name in enumerate(FEATURE_NAMES):
+        X[:, j] = batch[name]
+    return X, batch[LABEL.name]
+
+
+def _scale(X: np.ndarray, scaler: StandardScaler) -> np.ndarray:
+    X = X.astype(np.float64)
+    X[:, NUMERICAL_POSITIONS] = (X[:, NUMERICAL_POSITIONS] - scaler.mean_) / scaler.scale_
+    return X
+
+
+def assemble_voting_classifier(rf, gb, lr, weights=None) -> VotingClassifier:
+    """Wraps already fitted members in a soft-voting classifier, as VotingClassifier.fit would."""
+    voting_clf = VotingClassifier(estimators=[("rf", rf), ("gb", gb), ("lr", lr)], voting="soft", weights=weights)
+    voting_clf.estimators_ = [rf, gb, lr]
+    voting_clf.named_estimators_ = Bunch(rf=rf, gb=gb, lr=lr)
+    voting_clf.le_ = LabelEncoder().fit([0, 1])
+    voting_clf.classes_ = voting_clf.le_.classes_
+    return voting_clf
+
+
+def fit_streaming(dataset, rf_template, gb_template, test_size: float = 0.2, batch_rows: int = DEFAULT_BATCH_ROWS,
+                  sample_rows: int = DEFAULT_SAMPLE_ROWS, tree_rows: int = DEFAULT_TREE_ROWS,
+                  eval_rows: int = DEFAULT_EVAL_ROWS, epochs: int = DEFAULT_EPOCHS, seed: int = 42) -> Dict[str, Any]:
+    """
+    Trains the ensemble from a ColumnarDataset without loading it into memory.
+
+    1. One pass fits the scaler with partial_fit and keeps uniform samples of
+       up to `sample_rows` training rows and `eval_rows` held-out rows.
+    2. `epochs` passes over shuffled batches train the linear member with
+       SGD (logistic loss).
+    3. The random forest, each tree drawing its own bootstrap of at most
+       `tree_rows` rows, and the gradient boosting model are fitted on the
+       training sample.
+
+    Peak memory is bounded by the two samples plus one batch.
+    """
+    columns = FEATURE_NAMES + [LABEL.name]
+    n_features = len(FEATURE_NAMES)
+    train_sample = BottomKSample(sample_rows, n_features)
+    eval_sample = BottomKSample(eval_rows, n_features)
+    scaler = StandardScaler()
+    counts = {"train": 0, "test": 0}
+    timings = {}
+
+    start = time.perf_counter()
+    for offset, batch in zip(range(0, dataset.rows, batch_rows), dataset.iter_batches(batch_rows, columns)):
+        X, y = _batch_matrix(batch)
+        is_test = row_hash(offset, len(y), seed) < test_size
+        keys = row_hash(offset, len(y), seed + 1)
+        train = ~is_test
+        if train.any():
+            scaler.partial_fit(X[train][:, NUMERICAL_POSITIONS])
+        train_sample.add(X[train], y[train], keys[train])
+        eval_sample.add(X[is_test], y[is_test], keys[is_test])
+        counts["train"] += int(train.sum())
+        counts["test"] += int(is_test.sum())
+    timings["scan_seconds"] = time.perf_counter() - start
+    logging.info(f"Out-of-core scan: {counts['train']} train rows, {counts['test']} held out; "
+                 f"samples of {len(train_sample.y)} and {len(eval_sample.y)} rows kept")
+
+    start = time.perf_counter()
+    sgd = SGDClassifier(loss="log_loss", random_state=seed)
+    rng = np.random.RandomState(seed)
+    starts = np.arange(0, dataset.rows, batch_rows)
+    for epoch in range(epochs):
+        for offset in rng.permutation(starts):
+            batch = {name: np.asarray(dataset.columns[name][offset:offset + batch_rows]) for name in columns}
+            X, y = _batch_matrix(batch)
+            train = row_hash(offset, len(y), seed) >= test_size
+            if not train.any():
+                continue
+            order = rng.permutation(np.flatnonzero(train))
+            sgd.partial_fit(_scale(X[order], scaler), y[order], classes=[0, 1])
+    timings["sgd_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X_sample = _scale(train_sample.X, scaler)
+    rf = clone(rf_template).set_params(bootstrap=True, max_samples=min(tree_rows, len(train_sample.y)))
+    rf.fit(X_sample, train_sample.y)
+    gb = clone(gb_template).fit(X_sample, train_sample.y)
+    timings["tree_seconds"] = time.perf_counter() - start
+
+    return {
+        "model": assemble_voting_classifier(rf, gb, sgd),
+        "scaler": scaler,
+        "X_test": _scale(eval_sample.X, scaler),
+        "y_test": eval_sample.y.astype(np.int64),
+        "train_rows": counts["train"],
+        "test_rows": counts["test"],
+        "sample_rows": int(len(train_sample.y)),
+        "timings": timings,
+    }
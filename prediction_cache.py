@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from managed_db import get_pool
+from metrics import metrics
+from model_registry import registry
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("PULMO_PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_CACHE_TTL = float(os.environ.get("PULMO_PREDICTION_CACHE_TTL", 3600))
+# Optional SQLite file that keeps cached predictions across restarts; empty disables it.
+PREDICTION_CACHE_DB = os.environ.get("PULMO_PREDICTION_CACHE_DB", "")
+# Features are compared after rounding to this resolution, far below the form's input steps.
+QUANTUM = 1e-4
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prediction_cache (
+    key BLOB PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    prob_low REAL NOT NULL,
+    prob_high REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+SELECT_SQL = "SELECT prob_low, prob_high, created_at FROM prediction_cache WHERE key = ?"
+UPSERT_SQL = ("INSERT OR REPLACE INTO prediction_cache (key, model_version, prob_low, prob_high, created_at) "
+              "VALUES (?, ?, ?, ?, ?)")
+PURGE_SQL = "DELETE FROM prediction_cache WHERE created_at < ?"
+
+
+def feature_key(row: np.ndarray, model_version: str) -> bytes:
+    """Hash of the quantized feature vector and the model version that scored it."""
+    quantized = np.rint(np.asarray(row, dtype=np.float64).reshape(-1) / QUANTUM).astype(np.int64)
+    digest = hashlib.blake2b(quantized.tobytes(), digest_size=16)
+    digest.update(model_version.encode())
+    return digest.digest()
+
+
+class PredictionCache:
+    """
+    Process-wide LRU of predict_proba rows for exact repeat submissions.
+
+    Entries are keyed by feature_key(), so a new model version never serves an
+    old score, and expire after `ttl` seconds. The whole cache is dropped when
+    the model registry hot-swaps an artifact. With `db_path` set, entries are
+    also written to SQLite and survive restarts.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = get_pool(db_path) if db_path else None
+        if self._pool:
+            with self._pool.connection() as conn:
+                conn.executescript(CACHE_SCHEMA)
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, row: np.ndarray, model_version: Optional[str]) -> Optional[np.ndarray]:
+        """Returns the cached probability row, or None on a miss."""
+        if not model_version or self.max_entries <= 0:
+            return None
+        key = feature_key(row, model_version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+        if entry is not None:
+            metrics.inc("pulmo_prediction_cache_total", result="hit")
+            return entry[0]
+        proba = self._load(key, now)
+        with self._lock:
+            if proba is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["disk_hits"] += 1
+                self._insert(key, proba, now)
+        metrics.inc("pulmo_prediction_cache_total", result="miss" if proba is None else "disk_hit")
+        return proba
+
+    def put(self, row: np.ndarray, model_version: Optional[str], proba: np.ndarray) -> None:
+        if not model_version or self.max_entries <= 0:
+            return
+        key = feature_key(row, model_version)
+        proba = np.array(proba, dtype=np.float64).reshape(-1)
+        proba.setflags(write=False)
+        now = time.time()
+        with self._lock:
+            self._insert(key, proba, now)
+        if self._pool:
+            try:
+                with self._pool.transaction() as conn:
+                    conn.execute(UPSERT_SQL, (key, model_version, float(proba[0]), float(proba[1]), now))
+            except Exception as e:
+                logging.warning(f"Could not persist cached prediction: {e}")
+
+    def _insert(self, key: bytes, proba: np.ndarray, now: float) -> None:
+        self._entries[key] = (proba, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _load(self, key: bytes, now: float) -> Optional[np.ndarray]:
+        if not self._pool:
+            return None
+        try:
+            with self._pool.connection() as conn:
+                found = conn.execute(SELECT_SQL, (key,)).fetchone()
+        except Exception as e:
+            logging.warning(f"Could not read prediction cache: {e}")
+            return None
+        if found is None or found[2] + self.ttl <= now:
+            return None
+        proba = np.array(found[:2], dtype=np.float64)
+        proba.setflags(write=False)
+        return proba
+
+    def invalidate(self) -> None:
+        """Drops every in-memory entry and purges stored entries past their TTL."""
+        with self._lock:
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+        if self._pool:
+            try:
+                with self._pool.transaction() as conn:
+                    conn.execute(PURGE_SQL, (time.time() - self.ttl,))
+            except Exception as e:
+                logging.warning(f"Could not purge prediction cache: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hit_rate = (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+            return {**self.stats, "entries": len(self._entries), "hit_rate": round(hit_rate, 4)}
+
+
+prediction_cache = PredictionCache(db_path=PREDICTION_CACHE_DB or None)
+
+
+def _on_model_swap(path: str, digest: str) -> None:
+    prediction_cache.invalidate()
+    logging.info(f"Prediction cache cleared after {path} changed")
+
+
+registry.on_swap(_on_model_swap)
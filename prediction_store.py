@@ -0,0 +1,151 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from managed_db import get_pool
+
+# ---------------------------------------
+# Configure File Paths
+# ---------------------------------------
+BASE_DIR = os.path.dirname(__file__)
+PREDICTION_DB_PATH = os.path.join(BASE_DIR, "prediction.db")
+
+FEATURE_COLUMNS = [
+    ("age", "REAL"), ("sex", "INTEGER"), ("smoking", "INTEGER"), ("persistent_cough", "INTEGER"),
+    ("fatigue", "INTEGER"), ("cough_blood", "INTEGER"), ("chest_pain", "INTEGER"),
+    ("weight_loss", "INTEGER"), ("tumor_size", "REAL"), ("alk_phosphate", "REAL"), ("sgot", "REAL"),
+    ("lung_function", "REAL"), ("tumor_marker", "REAL"), ("histology", "INTEGER"),
+]
+RECORD_COLUMNS = (
+    ["username", "submission_id", "created_at"]
+    + [name for name, _ in FEATURE_COLUMNS]
+    + ["prob_low", "prob_high", "prediction", "model_version", "latency_ms"]
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    submission_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    {", ".join(f"{name} {sql_type} NOT NULL" for name, sql_type in FEATURE_COLUMNS)},
+    prob_low REAL NOT NULL,
+    prob_high REAL NOT NULL,
+    prediction TEXT NOT NULL,
+    model_version TEXT,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_username_created ON predictions(username, created_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions(created_at);
+"""
+INSERT_SQL = (
+    f"INSERT INTO predictions ({', '.join(RECORD_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in RECORD_COLUMNS)})"
+)
+HISTORY_SQL = (
+    f"SELECT {', '.join(RECORD_COLUMNS)} FROM predictions "
+    "WHERE username = ? ORDER BY created_at DESC LIMIT ?"
+)
+
+
+class PredictionStore:
+    """
+    Persistent prediction history with a buffered background writer.
+
+    `record` only enqueues the row; a daemon thread writes queued rows in one
+    transaction once `batch_size` rows are waiting or `flush_interval` seconds
+    have passed, so request threads never wait on disk.
+    """
+
+    def __init__(self, path: str = PREDICTION_DB_PATH, batch_size: int = 100, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._pool = get_pool(path)
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "errors": 0}
+
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._run, name="prediction-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, username: str, submission_id: int, features: Sequence[float], prob_low: float,
+               prob_high: float, prediction: str, model_version: Optional[str] = None,
+               latency_ms: Optional[float] = None) -> None:
+        """Queues one prediction for persistence without blocking the caller."""
+        if len(features) != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected {len(FEATURE_COLUMNS)} features, got {len(features)}")
+        row = (username, int(submission_id), time.time(), *features,
+               float(prob_low), float(prob_high), prediction, model_version, latency_ms)
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(row)
+        self.stats["queued"] += 1
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if not batch:
+                continue
+            try:
+                with self._pool.transaction() as conn:
+                    conn.executemany(INSERT_SQL, batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+            except sqlite3.Error as e:
+                self.stats["errors"] += 1
+                logging.error(f"Failed to persist {len(batch)} predictions: {e}")
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Blocks until every queued row has been written; returns False on timeout."""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def history(self, username: str, limit: int = 20) -> List[Dict]:
+        """Returns the user's most recent predictions, newest first."""
+        with self._pool.connection() as conn:
+            rows = conn.execute(HISTORY_SQL, (username, limit)).fetchall()
+        return [dict(zip(RECORD_COLUMNS, row)) for row in rows]
+
+
+_store: Optional[PredictionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PredictionStore:
+    """Returns the process-wide store, creating it (and its writer thread) on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PredictionStore()
+    return _store
@@ -0,0 +1,108 @@
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from feature_schema import schema
+
+
+class RiskRule(NamedTuple):
+    """
+    One risk factor: the patient is flagged when `feature <op> threshold`.
+    `high` and `low` describe the flagged and unflagged cases; both may use
+    {value} for the patient's value of `feature`.
+    """
+
+    title: str
+    feature: str
+    op: str
+    threshold: float
+    high: str
+    low: str
+
+
+class RiskFactor(NamedTuple):
+    title: str
+    description: str
+    high_risk: bool
+
+
+# ---------------------------------------
+# Rule table, in display order
+# ---------------------------------------
+RISK_RULES: List[RiskRule] = [
+    RiskRule("Smoking History", "smoking", "==", 1,
+             "Smoking is the leading cause of lung cancer.", "No smoking history reduces your risk."),
+    RiskRule("Age", "age", ">", 55,
+             "Risk increases significantly after age 55.", "Age {value:.0f} is within lower-risk range."),
+    RiskRule("Coughing Blood", "cough_blood", "==", 1,
+             "Hemoptysis may indicate tumor presence.", "No hemoptysis reported."),
+    RiskRule("Chest Pain", "chest_pain", "==", 1,
+             "Persistent pain can signal tumor growth.", "No chest pain reported."),
+    RiskRule("Weight Loss", "weight_loss", "==", 1,
+             "Unexplained weight loss is a concerning symptom.", "No weight loss reported."),
+    RiskRule("Tumor Size", "tumor_size", ">", 3,
+             "A {value:.1f} cm tumor suggests advanced disease.", "Tumor size {value:.1f} cm is less concerning."),
+    RiskRule("Tumor Marker", "tumor_marker", ">", 10,
+             "Elevated marker ({value:.1f} μg/L) indicates risk.", "Tumor marker {value:.1f} μg/L is normal."),
+    RiskRule("Lung Function", "lung_function", "<", 2,
+             "Reduced function suggests severe disease.", "Lung function {value:.1f}% is adequate."),
+    RiskRule("Histology", "histology", "==", 1,
+             "Abnormal biopsy confirms malignancy.", "Normal histology reduces concern."),
+]
+NO_RISK_FACTORS = RiskFactor("Overall Risk", "No major risk factors detected.", False)
+
+COMPARISONS = {">": np.greater, "<": np.less, "==": np.equal}
+
+
+class RiskRuleTable:
+    """
+    RISK_RULES compiled into column positions and threshold vectors, so the
+    flags for any number of patients come from one comparison per operator.
+    """
+
+    def __init__(self, rules: Sequence[RiskRule] = RISK_RULES):
+        unknown = [rule.op for rule in rules if rule.op not in COMPARISONS]
+        if unknown:
+            raise ValueError(f"Unknown rule operators {unknown}; expected one of {list(COMPARISONS)}")
+        self.rules = list(rules)
+        self.positions = np.array([schema.positions[rule.feature] for rule in self.rules])
+        self.thresholds = np.array([rule.threshold for rule in self.rules], dtype=np.float32)
+        self._groups = [(COMPARISONS[op], np.array([rule.op == op for rule in self.rules]))
+                        for op in COMPARISONS]
+        # Output column per rule for batch scoring, e.g. risk_tumor_size.
+        self.columns = [f"risk_{rule.feature}" for rule in self.rules]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def evaluate(self, rows) -> np.ndarray:
+        """(n, len(rules)) boolean flags for rows in training column order."""
+        values = schema.as_matrix(rows)[:, self.positions]
+        flags = np.empty(values.shape, dtype=bool)
+        for compare, mask in self._groups:
+            if mask.any():
+                flags[:, mask] = compare(values[:, mask], self.thresholds[mask])
+        return flags
+
+    def flag_columns(self, rows) -> Dict[str, np.ndarray]:
+        """One uint8 column per rule plus risk_factor_count, for appending to a scored cohort."""
+        flags = self.evaluate(rows)
+        columns = {name: flags[:, j].astype(np.uint8) for j, name in enumerate(self.columns)}
+        columns["risk_factor_count"] = flags.sum(axis=1)
+        return columns
+
+    def factors(self, row) -> List[RiskFactor]:
+        """Every rule's outcome for one patient, with NO_RISK_FACTORS appended when none is flagged."""
+        values = schema.as_matrix(row)
+        if values.shape[0] != 1:
+            raise ValueError(f"Expected a single feature row, got {values.shape[0]}")
+        flags = self.evaluate(values)[0]
+        patient = values[0, self.positions]
+        factors = [RiskFactor(rule.title, (rule.high if flagged else rule.low).format(value=float(value)), bool(flagged))
+                   for rule, flagged, value in zip(self.rules, flags, patient)]
+        if not flags.any():
+            factors.append(NO_RISK_FACTORS)
+        return factors
+
+
+risk_rules = RiskRuleTable()
@@ -0,0 +1,169 @@
+"""
+Import-time profiling for the Streamlit pages.
+
+In the app: with PULMO_PROFILE_IMPORTS=1, every first-time import is timed
+from the moment this module is imported (the pages import it first). The
+first run of each page writes an `-X importtime`-style report to
+startup_profile/<page>.txt and logs the slowest imports.
+
+From the command line, each page is imported in a fresh interpreter under
+`python -X importtime`:
+
+    python -m startup_profiler app prediction visualizations [--top 15]
+"""
+import argparse
+import builtins
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+PROFILE_IMPORTS = os.environ.get("PULMO_PROFILE_IMPORTS", "") == "1"
+REPORT_DIR = os.environ.get("PULMO_PROFILE_DIR", "startup_profile")
+DEFAULT_PAGES = ("app", "prediction", "visualizations")
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def format_report(timings: List[ImportTiming], top: Optional[int] = None) -> str:
+    """Same layout as `python -X importtime`, optionally limited to the `top` slowest by self time."""
+    rows = sorted(timings, key=lambda t: -t.self_us)[:top] if top else timings
+    lines = ["import time: self [us] | cumulative | imported package"]
+    # Nesting only reads correctly in import order, so the top-N view is flat.
+    lines += [f"import time: {t.self_us:>9} | {t.cumulative_us:>10} | {'' if top else '  ' * t.depth}{t.module}"
+              for t in rows]
+    return "\n".join(lines)
+
+
+# ---------------------------------------
+# In-process import timer
+# ---------------------------------------
+class ImportTimer:
+    """
+    Wraps builtins.__import__ and times every import that loads a module for
+    the first time. Nested imports are subtracted to get the self time.
+    """
+
+    def __init__(self):
+        self.timings: List[ImportTiming] = []
+        self.started = time.perf_counter()
+        self._original = builtins.__import__
+        self._local = threading.local()
+        self._reported = 0
+
+    def install(self) -> None:
+        builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        builtins.__import__ = self._original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = (time.perf_counter_ns() - start) // 1000
+            children = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            self.timings.append(ImportTiming(name, max(cumulative - children, 0), cumulative, len(stack)))
+
+    def take_new(self) -> List[ImportTiming]:
+        """Timings recorded since the previous call."""
+        new = self.timings[self._reported:]
+        self._reported = len(self.timings)
+        return new
+
+
+_timer: Optional[ImportTimer] = None
+_pages_reported = set()
+
+if PROFILE_IMPORTS:
+    _timer = ImportTimer()
+    _timer.install()
+
+
+def page_loaded(page: str, top: int = 10) -> None:
+    """
+    Called at the end of a page's first run: writes the imports it triggered
+    to startup_profile/<page>.txt and logs the slowest ones. A no-op unless
+    PULMO_PROFILE_IMPORTS=1, and after the first call per page.
+    """
+    if _timer is None or page in _pages_reported:
+        return
+    _pages_reported.add(page)
+    timings = _timer.take_new()
+    total_ms = sum(t.cumulative_us for t in timings if t.depth == 0) / 1000
+    elapsed_ms = (time.perf_counter() - _timer.started) * 1000
+    try:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        with open(os.path.join(REPORT_DIR, f"{page}.txt"), "w") as f:
+            f.write(format_report(timings) + "\n")
+    except OSError as e:
+        logging.warning(f"Could not write import profile for {page}: {e}")
+    slowest = ", ".join(f"{t.module} {t.self_us / 1000:.1f} ms" for t in sorted(timings, key=lambda t: -t.self_us)[:top])
+    logging.info(f"Page {page} first run: {len(timings)} modules imported in {total_ms:.1f} ms "
+                 f"({elapsed_ms:.1f} ms since process start); slowest: {slowest}")
+
+
+# ---------------------------------------
+# Command line: fresh-interpreter profile per page
+# ---------------------------------------
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        indent = len(name) - len(name.lstrip())
+        timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us), max(indent - 1, 0) // 2))
+    return timings
+
+
+def profile_page(page: str) -> List[ImportTiming]:
+    """Imports `page` in a new interpreter under -X importtime and returns the parsed timings."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {page}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    timings = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(f"Importing {page} failed: {error}")
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m startup_profiler", description="Profile page import time.")
+    parser.add_argument("pages", nargs="*", default=list(DEFAULT_PAGES), help="Page modules to import")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list per page")
+    args = parser.parse_args(argv)
+    status = 0
+    for page in args.pages:
+        try:
+            timings = profile_page(page)
+        except RuntimeError as e:
+            print(e)
+            status = 1
+            continue
+        total_ms = next((t.cumulative_us for t in reversed(timings) if t.module == page), 0) / 1000
+        print(f"== {page}: {total_ms:.1f} ms to import, {len(timings)} modules")
+        print(format_report(timings, args.top))
+        print()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Page stylesheets served as fingerprinted static files.
+
+Each page's CSS lives in styles/<page>.css. On first use it is written to
+static/<page>.<hash>.css, which Streamlit serves under app/static/ when
+server.enableStaticServing is on (see .streamlit/config.toml). Every rerun
+then sends a one-line <link> tag instead of the stylesheet, and because the
+file name changes with its content the browser never needs to re-fetch it.
+Without static serving the CSS is inlined as before.
+
+Fonts are served locally once
+
+    python -m static_assets fonts
+
+has stored the woff2 files under static/fonts/ (e.g. when building the
+image); until then each stylesheet starts with the remote Google Fonts
+@import, as the pages did before.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import urllib.request
+from typing import Dict, Tuple
+
+import streamlit as st
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STYLES_DIR = os.path.join(BASE_DIR, "styles")
+# Streamlit serves the `static` directory next to the main script at app/static/.
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+FONTS_DIR = os.path.join(STATIC_DIR, "fonts")
+FONTS_CSS = os.path.join(FONTS_DIR, "fonts.css")
+
+GOOGLE_FONTS_URL = ("https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800"
+                    "&family=Poppins:wght@300;400;500;600;700&family=Space+Grotesk:wght@400;500;600;700"
+                    "&display=swap")
+FONTS_IMPORT = f"@import url('{GOOGLE_FONTS_URL}');\n"
+# Google only returns woff2 @font-face rules to browsers it recognises.
+FONTS_USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                    "Chrome/124.0 Safari/537.36")
+
+_lock = threading.Lock()
+# page -> (source mtimes, built file name, css)
+_built: Dict[str, Tuple[Tuple[float, ...], str, str]] = {}
+
+
+def _sources(page: str):
+    sources = [os.path.join(STYLES_DIR, f"{page}.css")]
+    if os.path.exists(FONTS_CSS):
+        sources.insert(0, FONTS_CSS)
+    return sources
+
+
+def build_stylesheet(page: str) -> Tuple[str, str]:
+    """
+    Returns (file name under static/, css) for `page`, writing the
+    fingerprinted file if it does not exist yet. Rebuilt only when a source
+    file changes.
+    """
+    sources = _sources(page)
+    mtimes = tuple(os.stat(path).st_mtime_ns for path in sources)
+    built = _built.get(page)
+    if built is not None and built[0] == mtimes:
+        return built[1], built[2]
+
+    with _lock:
+        css = "\n".join(open(path, encoding="utf-8").read() for path in sources)
+        if FONTS_CSS not in sources:
+            css = FONTS_IMPORT + css
+        digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+        name = f"{page}.{digest}.css"
+        path = os.path.join(STATIC_DIR, name)
+        if not os.path.exists(path):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.replace(tmp_path, path)
+            logging.info(f"Built stylesheet {name} ({len(css)} bytes)")
+        _built[page] = (mtimes, name, css)
+    return name, css
+
+
+def stylesheet_tag(page: str) -> str:
+    """A <link> to the static stylesheet, or an inline <style> block when static serving is off."""
+    try:
+        name, css = build_stylesheet(page)
+    except OSError as e:
+        logging.warning(f"Could not build stylesheet for {page}: {e}")
+        return ""
+    if st.get_option("server.enableStaticServing"):
+        return f'<link rel="stylesheet" href="{STATIC_URL}/{name}">'
+    return f"<style>\n{css}</style>"
+
+
+def apply_stylesheet(page: str) -> None:
+    st.markdown(stylesheet_tag(page), unsafe_allow_html=True)
+
+
+# ---------------------------------------
+# Local fonts
+# ---------------------------------------
+FONT_FACE_PATTERN = re.compile(r"/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*\{[^}]*\})")
+FONT_URL_PATTERN = re.compile(r"url\((https://[^)]+)\)")
+
+
+def _download(url: str) -> bytes:
+    request = urllib.request.Request(url, headers={"User-Agent": FONTS_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def localize_font_css(css: str, subsets=("latin",)) -> Tuple[str, Dict[str, str]]:
+    """
+    Keeps the @font-face rules for `subsets` from a Google Fonts stylesheet and
+    points them at fonts/<file>. Returns (css, {file name: remote url}).
+    """
+    rules, files = [], {}
+    for subset, rule in FONT_FACE_PATTERN.findall(css):
+        if subset not in subsets:
+            continue
+        for url in FONT_URL_PATTERN.findall(rule):
+            name = url.rsplit("/", 1)[-1]
+            files[name] = url
+            rule = rule.replace(url, f"fonts/{name}")
+        rules.append(f"/* {subset} */\n{rule}")
+    return "\n".join(rules) + "\n", files
+
+
+def fetch_fonts(url: str = GOOGLE_FONTS_URL) -> int:
+    """Downloads the fonts used by the pages into static/fonts/; returns how many files were written."""
+    css, files = localize_font_css(_download(url).decode("utf-8"))
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    for name, font_url in files.items():
+        with open(os.path.join(FONTS_DIR, name), "wb") as f:
+            f.write(_download(font_url))
+    with open(FONTS_CSS, "w", encoding="utf-8") as f:
+        f.write(css)
+    return len(files)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m static_assets", description="Build static page assets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("fonts", help="Download the page fonts into static/fonts/")
+    build = sub.add_parser("build", help="Write the fingerprinted stylesheets into static/")
+    build.add_argument("pages", nargs="*", default=["app", "prediction", "visualizations"])
+    args = parser.parse_args(argv)
+
+    if args.command == "fonts":
+        count = fetch_fonts()
+        print(f"Wrote {count} font files to {FONTS_DIR}")
+    else:
+        for page in args.pages:
+            name, css = build_stylesheet(page)
+            print(f"{STATIC_URL}/{name}  {len(css)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The app is a set of flat modules in the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATASET_PATH = os.path.join(ROOT, "lung_cancer_new.csv")
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    import pandas as pd
+    return pd.read_csv(DATASET_PATH)
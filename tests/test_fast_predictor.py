@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import fast_predictor
+from fast_predictor import FastPredictor, compile_ensemble, load_compact, save_compact
+from feature_schema import FEATURE_NAMES, NUMERICAL_NAMES
+
+
+@pytest.fixture(scope="module")
+def fitted(dataset):
+    """A small ensemble with the same members and voting as train_model.build_model."""
+    X = dataset[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    y = dataset["class"].to_numpy()
+    scaler = StandardScaler().fit(X)
+    X = scaler.transform(X)
+    model = VotingClassifier(estimators=[
+        ("rf", RandomForestClassifier(n_estimators=15, random_state=42)),
+        ("gb", GradientBoostingClassifier(n_estimators=15, random_state=42)),
+        ("lr", LogisticRegression(max_iter=1000, random_state=42)),
+    ], voting="soft").fit(X, y)
+    return model, scaler, X
+
+
+def test_compact_matches_pickle(fitted):
+    model, _, X = fitted
+    predictor = FastPredictor(compile_ensemble(model))
+    np.testing.assert_allclose(predictor.predict_proba(X[:200]), model.predict_proba(X[:200]), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(predictor.predict_proba(X[0]), model.predict_proba(X[:1]), rtol=0, atol=1e-9)
+
+
+def test_chunked_and_fallback_batches_match_pickle(fitted):
+    model, _, X = fitted
+    compiled = compile_ensemble(model)
+    expected = model.predict_proba(X)
+    assert len(X) > fast_predictor.BATCH_ROWS
+    np.testing.assert_allclose(FastPredictor(compiled).predict_proba(X), expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(FastPredictor(compiled, fallback=lambda: model).predict_proba(X), expected,
+                               rtol=0, atol=1e-9)
+
+
+def test_saved_compact_model_round_trips(fitted, tmp_path):
+    model, scaler, X = fitted
+    header = save_compact(str(tmp_path), compile_ensemble(model), FEATURE_NAMES, NUMERICAL_NAMES, scaler)
+    predictor, array_scaler = load_compact(header)
+    np.testing.assert_allclose(predictor.predict_proba(X[:100]), model.predict_proba(X[:100]), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(array_scaler.mean_, scaler.mean_)
+    np.testing.assert_allclose(array_scaler.scale_, scaler.scale_)
+
+
+def test_compile_refuses_a_mismatching_export(fitted, monkeypatch):
+    model, _, _ = fitted
+    monkeypatch.setattr(fast_predictor, "_gb_init_log_odds", lambda gb, n_features: 0.5)
+    with pytest.raises(ValueError, match="refusing to export"):
+        compile_ensemble(model)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from feature_schema import COLUMNS, DTYPES, validate_frame
+
+
+@pytest.fixture
+def frame(dataset):
+    """Five rows: one clean, one with age above range, one with tumor_size below, one missing, one bad flag."""
+    df = dataset.head(5).copy()
+    df.loc[1, "age"] = 120.0
+    df.loc[2, "tumor_size"] = -1.0
+    df.loc[3, "sgot"] = np.nan
+    df.loc[4, "smoking"] = 2.0
+    return df
+
+
+def test_clip_clamps_out_of_range_and_drops_unrepairable_rows(frame):
+    out, issues = validate_frame(frame, policy="clip")
+    assert list(out.index) == [0, 1, 2]
+    assert out.loc[1, "age"] == 95
+    assert out.loc[2, "tumor_size"] == 0
+    assert dict(out.dtypes.astype(str)) == DTYPES
+    assert issues == {
+        "age": {"out_of_range": 1, "missing": 0},
+        "tumor_size": {"out_of_range": 1, "missing": 0},
+        "sgot": {"out_of_range": 0, "missing": 1},
+        "smoking": {"out_of_range": 1, "missing": 0},
+    }
+
+
+def test_drop_removes_every_invalid_row(frame):
+    out, issues = validate_frame(frame, policy="drop")
+    assert list(out.index) == [0]
+    assert set(issues) == {"age", "tumor_size", "sgot", "smoking"}
+
+
+def test_raise_reports_the_first_bad_column(frame):
+    with pytest.raises(ValueError, match="Column 'age'"):
+        validate_frame(frame, policy="raise")
+    out, issues = validate_frame(frame.head(1), policy="raise")
+    assert len(out) == 1 and issues == {}
+
+
+def test_rejects_unknown_policy_and_wrong_columns(frame):
+    with pytest.raises(ValueError, match="Unknown validation policy"):
+        validate_frame(frame, policy="ignore")
+    with pytest.raises(ValueError, match="columns do not match"):
+        validate_frame(frame[COLUMNS[::-1]])
+
+
+def test_unlabelled_rows_keep_extra_columns_and_precision(frame):
+    rows = frame.drop(columns="class").assign(patient_id=["a", "b", "c", "d", "e"])
+    out, _ = validate_frame(rows, policy="clip", labelled=False)
+    assert list(out["patient_id"]) == ["a", "b", "c"]
+    assert out["alk_phosphate"].dtype == np.float64
+    assert out.loc[0, "alk_phosphate"] == rows.loc[0, "alk_phosphate"]
+    with pytest.raises(ValueError, match="missing required columns"):
+        validate_frame(rows.drop(columns="age"), labelled=False)
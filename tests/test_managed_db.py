@@ -0,0 +1,71 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import managed_db
+
+BASELINE_ROWS = [
+    ("alice", "plain-text"),
+    ("bob", "old-text"),
+    ("bob", b"$2b$12$olderhash"),
+    ("bob", b"$2b$12$newesthash"),
+    ("bob", "newer-text"),
+    ("carol", b"$2b$12$carolhash"),
+    ("", "empty-name"),
+    ("", "empty-name-again"),
+    (None, "no-name"),
+]
+
+
+def make_baseline_db(path):
+    """A users database as the first version of managed_db created it: no key, duplicate usernames."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE userstable(username Text,password Text)")
+    conn.executemany("INSERT INTO userstable(username,password) VALUES (?,?)", BASELINE_ROWS)
+    conn.commit()
+    conn.close()
+
+
+def read(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_migration_v1_deduplicates_baseline_users(tmp_path):
+    path = str(tmp_path / "usersdata.db")
+    make_baseline_db(path)
+    managed_db.migrate(path)
+
+    assert read(path, "PRAGMA user_version") == [(1,)]
+    rows = dict(read(path, "SELECT username, password FROM userstable"))
+    assert rows == {
+        "alice": "plain-text",
+        "bob": b"$2b$12$newesthash",
+        "carol": b"$2b$12$carolhash",
+        "": "empty-name-again",
+    }
+    assert managed_db.get_password_hash("bob", path) == b"$2b$12$newesthash"
+    with pytest.raises(sqlite3.IntegrityError):
+        managed_db.insert_user("carol", b"$2b$12$another", path)
+
+
+def test_migration_v1_creates_table_on_a_new_database(tmp_path):
+    path = str(tmp_path / "new.db")
+    managed_db.migrate(path)
+    managed_db.insert_user("dave", b"$2b$12$davehash", path)
+    assert read(path, "PRAGMA user_version") == [(1,)]
+    assert managed_db.get_password_hash("dave", path) == b"$2b$12$davehash"
+
+
+def test_migration_v1_keeps_every_shipped_user(tmp_path):
+    path = str(tmp_path / "usersdata.db")
+    shutil.copy(managed_db.USERS_DB_PATH, path)
+    before = {name for (name,) in read(path, "SELECT username FROM userstable WHERE username IS NOT NULL")}
+    managed_db.migrate(path)
+    after = read(path, "SELECT username FROM userstable")
+    assert read(path, "PRAGMA user_version") == [(1,)]
+    assert sorted(name for (name,) in after) == sorted(before)
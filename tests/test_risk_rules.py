@@ -0,0 +1,86 @@
+import numpy as np
+
+from risk_rules import risk_rules
+
+
+def baseline_risk_factors(feature_list):
+    """The original prediction.show_risk_factors rules, without the Streamlit markup."""
+    risk_factors = []
+    if feature_list[2] == 1:
+        risk_factors.append(("Smoking History", "Smoking is the leading cause of lung cancer.", "high-risk"))
+    else:
+        risk_factors.append(("Smoking History", "No smoking history reduces your risk.", "low-risk"))
+    if feature_list[0] > 55:
+        risk_factors.append(("Age", "Risk increases significantly after age 55.", "high-risk"))
+    else:
+        risk_factors.append(("Age", f"Age {feature_list[0]} is within lower-risk range.", "low-risk"))
+    if feature_list[5] == 1:
+        risk_factors.append(("Coughing Blood", "Hemoptysis may indicate tumor presence.", "high-risk"))
+    else:
+        risk_factors.append(("Coughing Blood", "No hemoptysis reported.", "low-risk"))
+    if feature_list[6] == 1:
+        risk_factors.append(("Chest Pain", "Persistent pain can signal tumor growth.", "high-risk"))
+    else:
+        risk_factors.append(("Chest Pain", "No chest pain reported.", "low-risk"))
+    if feature_list[7] == 1:
+        risk_factors.append(("Weight Loss", "Unexplained weight loss is a concerning symptom.", "high-risk"))
+    else:
+        risk_factors.append(("Weight Loss", "No weight loss reported.", "low-risk"))
+    if feature_list[8] > 3:
+        risk_factors.append(("Tumor Size", f"A {feature_list[8]:.1f} cm tumor suggests advanced disease.", "high-risk"))
+    else:
+        risk_factors.append(("Tumor Size", f"Tumor size {feature_list[8]:.1f} cm is less concerning.", "low-risk"))
+    if feature_list[12] > 10:
+        risk_factors.append(("Tumor Marker", f"Elevated marker ({feature_list[12]:.1f} μg/L) indicates risk.", "high-risk"))
+    else:
+        risk_factors.append(("Tumor Marker", f"Tumor marker {feature_list[12]:.1f} μg/L is normal.", "low-risk"))
+    if feature_list[11] < 2:
+        risk_factors.append(("Lung Function", "Reduced function suggests severe disease.", "high-risk"))
+    else:
+        risk_factors.append(("Lung Function", f"Lung function {feature_list[11]:.1f}% is adequate.", "low-risk"))
+    if feature_list[13] == 1:
+        risk_factors.append(("Histology", "Abnormal biopsy confirms malignancy.", "high-risk"))
+    else:
+        risk_factors.append(("Histology", "Normal histology reduces concern.", "low-risk"))
+    if not any(rf[2] == "high-risk" for rf in risk_factors):
+        risk_factors.append(("Overall Risk", "No major risk factors detected.", "low-risk"))
+    return risk_factors
+
+
+def as_baseline(factors):
+    return [(f.title, f.description, "high-risk" if f.high_risk else "low-risk") for f in factors]
+
+
+def form_rows(n=500, seed=0):
+    """Rows as the prediction form produces them: whole-year ages, one-decimal measurements."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n):
+        flags = rng.integers(0, 2, size=8).tolist()
+        rows.append([int(rng.integers(20, 96)), flags[0], flags[1], flags[2], flags[3], flags[4], flags[5], flags[6],
+                     round(float(rng.uniform(0, 8)), 1), round(float(rng.uniform(40, 296)), 1),
+                     round(float(rng.uniform(10, 648)), 1), round(float(rng.uniform(0.5, 5)), 1),
+                     round(float(rng.uniform(0, 100)), 1), flags[7]])
+    return rows
+
+
+def test_factors_match_baseline_strings():
+    for row in form_rows():
+        assert as_baseline(risk_rules.factors(row)) == baseline_risk_factors(row)
+
+
+def test_factors_at_thresholds_and_without_risk():
+    # Every comparison sits exactly on its threshold, so nothing is flagged.
+    row = [55, 0, 0, 0, 0, 0, 0, 0, 3.0, 100.0, 50.0, 2.0, 10.0, 0]
+    factors = risk_rules.factors(row)
+    assert as_baseline(factors) == baseline_risk_factors(row)
+    assert factors[-1].title == "Overall Risk" and not any(f.high_risk for f in factors)
+
+
+def test_flag_columns_agree_with_factors():
+    rows = form_rows(50, seed=1)
+    columns = risk_rules.flag_columns(rows)
+    for i, row in enumerate(rows):
+        flagged = [f.high_risk for f in risk_rules.factors(row)][:len(risk_rules)]
+        assert [bool(columns[name][i]) for name in risk_rules.columns] == flagged
+        assert columns["risk_factor_count"][i] == sum(flagged)
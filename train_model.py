@@ -1,92 +1,647 @@
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import VotingClassifier, RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.metrics import accuracy_score, classification_report, log_loss, roc_auc_score
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import copy
+import hashlib
+import io
 import joblib
+import json
 import os
 import logging
+import time
+from datetime import datetime, timezone
+from fast_predictor import compile_ensemble, remove_compact, save_compact
+from feature_importance import DEFAULT_REPEATS, compute_importances, save_importances
+from feature_schema import COLUMNS, FEATURE_NAMES, NUMERICAL_NAMES, VALIDATION_POLICIES, log_issues, validate_frame
+from ingest import DEFAULT_CHUNKSIZE, load_dataset
+from logging_setup import configure_logging
+from inference import score_batch
+from out_of_core import (DEFAULT_BATCH_ROWS, DEFAULT_EPOCHS, DEFAULT_EVAL_ROWS, DEFAULT_SAMPLE_ROWS, DEFAULT_TREE_ROWS,
+                         fit_streaming)
+from model_registry import MODEL_DIR, MODEL_PATH, SCALER_PATH, file_digest
 
-logging.basicConfig(filename="train.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-np.random.seed(42)
 DATA_PATH = "data/lung_cancer_new.csv"
-MODEL_PATH = "models/voting_model.pkl"
-SCALER_PATH = "models/scaler.pkl"
-logging.info("Starting train_model.py")
-
-if not os.path.exists(DATA_PATH):
-    logging.error(f"Dataset not found at {DATA_PATH}")
-    raise FileNotFoundError(f"Dataset not found at {DATA_PATH}")
-
-logging.info(f"Loading dataset from {DATA_PATH}")
-try:
-    data = pd.read_csv(DATA_PATH)
-    logging.info(f"Dataset loaded: {data.shape[0]} rows, {data.shape[1]} columns")
-except Exception as e:
-    logging.error(f"Error loading dataset: {e}")
-    raise
-
-expected_columns = ["age", "sex", "smoking", "persistent_cough", "fatigue", "cough_blood", "chest_pain",
-                    "weight_loss", "tumor_size", "alk_phosphate", "sgot", "lung_function", "tumor_marker",
-                    "histology", "class"]
-if list(data.columns) != expected_columns:
-    logging.error(f"Dataset columns mismatch. Expected: {expected_columns}, Got: {list(data.columns)}")
-    raise ValueError("Dataset columns do not match expected features")
-
-X = data.drop("class", axis=1)
-y = data["class"]
-logging.info("Data split into X and y")
-
-scaler = StandardScaler()
-numerical_cols = ["age", "tumor_size", "alk_phosphate", "sgot", "lung_function", "tumor_marker"]
-try:
-    X[numerical_cols] = scaler.fit_transform(X[numerical_cols])
-    logging.info("Numerical features scaled")
-except Exception as e:
-    logging.error(f"Error scaling features: {e}")
-    raise
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-logging.info(f"Data split: {len(X_train)} train, {len(X_test)} test")
-
-rf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-gb = GradientBoostingClassifier(n_estimators=100, random_state=42)
-lr = LogisticRegression(max_iter=1000, random_state=42)
-voting_clf = VotingClassifier(estimators=[("rf", rf), ("gb", gb), ("lr", lr)], voting="soft", n_jobs=-1)
-
-try:
-    voting_clf.fit(X_train, y_train)
-    logging.info("Model training completed")
-except Exception as e:
-    logging.error(f"Error training model: {e}")
-    raise
-
-y_pred = voting_clf.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
-logging.info(f"Model accuracy: {accuracy:.4f}")
-print(f"Accuracy: {accuracy:.4f}")
-print("Classification Report:")
-print(classification_report(y_test, y_pred, target_names=["Low Risk", "High Risk"]))
-
-try:
-    os.makedirs("models", exist_ok=True)
-    logging.info(f"Saving model to {MODEL_PATH}")
-    joblib.dump(voting_clf, MODEL_PATH)
-    file_size = os.path.getsize(MODEL_PATH) / 1024
-    logging.info(f"Model saved: {MODEL_PATH}, Size: {file_size:.2f} KB")
-except Exception as e:
-    logging.error(f"Error saving model: {e}")
-    raise
-
-try:
-    logging.info(f"Saving scaler to {SCALER_PATH}")
-    joblib.dump(scaler, SCALER_PATH)
-    file_size = os.path.getsize(SCALER_PATH) / 1024
-    logging.info(f"Scaler saved: {SCALER_PATH}, Size: {file_size:.2f} KB")
-except Exception as e:
-    logging.error(f"Error saving scaler: {e}")
-    raise
-
-print(f"Model and scaler saved: {MODEL_PATH}, {SCALER_PATH}")
\ No newline at end of file
+COMPACT_MODEL_DIR = os.path.join(MODEL_DIR, "voting_model")
+MANIFEST_PATH = os.path.join(MODEL_DIR, "manifest.json")
+IMPORTANCE_PATH = os.path.join(MODEL_DIR, "feature_importance.json")
+CV_CACHE_DIR = os.path.join(MODEL_DIR, "cv_cache")
+RANDOM_STATE = 42
+
+# Column names, dtypes and valid ranges live in feature_schema so training and serving agree.
+expected_columns = COLUMNS
+feature_columns = FEATURE_NAMES
+numerical_cols = NUMERICAL_NAMES
+
+# Baseline configuration, used as-is when the search is disabled.
+BASE_ESTIMATORS = {
+    "rf": RandomForestClassifier(n_estimators=100, random_state=RANDOM_STATE),
+    "gb": GradientBoostingClassifier(n_estimators=100, random_state=RANDOM_STATE),
+    "lr": LogisticRegression(max_iter=1000, random_state=RANDOM_STATE),
+}
+SEARCH_SPACE = {
+    "rf": {"n_estimators": [100, 200], "max_depth": [None, 8], "min_samples_leaf": [1, 3]},
+    "gb": {"n_estimators": [100, 200], "learning_rate": [0.05, 0.1], "max_depth": [2, 3]},
+    "lr": {"C": [0.1, 1.0, 10.0]},
+}
+
+# Fold data shared with pool workers through the initializer instead of per-task pickling.
+_WORKER_DATA = {}
+
+
+def _init_worker(X, y, splits):
+    _WORKER_DATA.update(X=X, y=y, splits=splits)
+
+
+def _evaluate_fold(task):
+    """Fits one (estimator, params) candidate on one CV fold and scores it on the held-out fold."""
+    name, params, fold = task
+    X, y = _WORKER_DATA["X"], _WORKER_DATA["y"]
+    train_idx, val_idx = _WORKER_DATA["splits"][fold]
+    estimator = clone(BASE_ESTIMATORS[name]).set_params(**params)
+    start = time.perf_counter()
+    estimator.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    proba = estimator.predict_proba(X[val_idx])[:, 1]
+    return {
+        "estimator": name,
+        "params": params,
+        "fold": fold,
+        "accuracy": float(accuracy_score(y[val_idx], (proba > 0.5).astype(int))),
+        "roc_auc": float(roc_auc_score(y[val_idx], proba)),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def _matrix_digest(X, y):
+    """
+    SHA-256 of the exact matrix and labels being cross-validated, so a change in
+    validation policy, schema, scaling or split cannot reuse stale fold results.
+    """
+    digest = hashlib.sha256()
+    for array in (X, y):
+        digest.update(f"{array.dtype}{array.shape}".encode("utf-8"))
+        digest.update(np.ascontiguousarray(array))
+    return digest.hexdigest()
+
+
+def _task_key(data_hash, n_folds, name, params, fold):
+    payload = json.dumps([data_hash, n_folds, RANDOM_STATE, name, params, fold], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def run_search(X_train, y_train, n_folds=5, workers=None, cache_dir=CV_CACHE_DIR, search=True):
+    """
+    Runs k-fold CV over the search space of each ensemble member in a process pool.
+
+    Every fold result is written to `cache_dir` as soon as it completes, keyed by
+    a hash of the training matrix, so an interrupted search resumes from the folds
+    that already finished.
+    Returns ({name: best_params}, {name: [per-candidate summaries]}).
+    """
+    X = np.ascontiguousarray(X_train, dtype=np.float64)
+    y = np.asarray(y_train)
+    data_hash = _matrix_digest(X, y)
+    splits = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    space = {name: (SEARCH_SPACE[name] if search else {}) for name in BASE_ESTIMATORS}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    results, pending = [], []
+    for name, grid in space.items():
+        for params in ParameterGrid(grid):
+            for fold in range(n_folds):
+                path = os.path.join(cache_dir, _task_key(data_hash, n_folds, name, params, fold) + ".json")
+                if os.path.exists(path):
+                    with open(path) as f:
+                        results.append(json.load(f))
+                else:
+                    pending.append(((name, params, fold), path))
+    logging.info(f"CV search: {len(results)} fold results cached, {len(pending)} to run")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, splits)) as pool:
+            futures = {pool.submit(_evaluate_fold, task): path for task, path in pending}
+            for future in as_completed(futures):
+                result, path = future.result(), futures[future]
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(result, f)
+                os.replace(tmp_path, path)
+                results.append(result)
+
+    summaries = {name: [] for name in space}
+    for name, grid in space.items():
+        for params in ParameterGrid(grid):
+            folds = [r for r in results if r["estimator"] == name and r["params"] == params]
+            summaries[name].append({
+                "params": params,
+                "roc_auc_mean": float(np.mean([r["roc_auc"] for r in folds])),
+                "roc_auc_std": float(np.std([r["roc_auc"] for r in folds])),
+                "accuracy_mean": float(np.mean([r["accuracy"] for r in folds])),
+                "fit_seconds": float(np.sum([r["fit_seconds"] for r in folds])),
+            })
+    best = {
+        name: max(candidates, key=lambda c: (c["roc_auc_mean"], c["accuracy_mean"]))["params"]
+        for name, candidates in summaries.items()
+    }
+    return best, summaries
+
+
+def build_voting_classifier(best_params):
+    """Builds the soft-voting ensemble from the selected member parameters."""
+    estimators = []
+    for name in ("rf", "gb", "lr"):
+        estimator = clone(BASE_ESTIMATORS[name]).set_params(**best_params.get(name, {}))
+        if name == "rf":
+            estimator.set_params(n_jobs=-1)
+        estimators.append((name, estimator))
+    return VotingClassifier(estimators=estimators, voting="soft", n_jobs=-1)
+
+
+def _artifact_info(path):
+    return {"path": path, "size_kb": round(os.path.getsize(path) / 1024, 2), "sha256": file_digest(path)}
+
+
+def write_manifest(path, manifest):
+    """Writes the manifest atomically next to the model artifacts."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+# ---------------------------------------
+# Incremental Training
+# ---------------------------------------
+def _prefix_digest(path, n_bytes, chunk_size=1 << 20):
+    """SHA-256 of the first `n_bytes` bytes of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = n_bytes
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def data_watermark(path, rows):
+    """Marks how far into the (append-only) dataset the saved model has been trained."""
+    size = os.path.getsize(path)
+    return {"rows": int(rows), "bytes": size, "prefix_sha256": _prefix_digest(path, size)}
+
+
+def read_new_rows(path, watermark):
+    """
+    Returns only the rows appended after `watermark`, parsing nothing before it.
+    Raises ValueError if the already-trained part of the file was modified.
+    """
+    offset = watermark["bytes"]
+    if os.path.getsize(path) < offset or _prefix_digest(path, offset) != watermark["prefix_sha256"]:
+        raise ValueError(f"{path} changed before the watermark; run a full retrain")
+    with open(path, "rb") as f:
+        f.seek(max(offset - 1, 0))
+        if offset and f.read(1) != b"\n":
+            raise ValueError(f"{path} does not end in a newline at the watermark; run a full retrain")
+        tail = f.read()
+    if not tail.strip():
+        return pd.DataFrame(columns=expected_columns)
+    return pd.read_csv(io.BytesIO(tail), header=None, names=expected_columns)
+
+
+def continue_linear(lr, X_new, y_new, rows_seen, epochs):
+    """
+    Continues the linear member on new rows with SGD (logistic loss), starting
+    from its current coefficients. A LogisticRegression is converted with the
+    same L2 penalty per row and a step-size schedule that resumes after
+    `rows_seen` rows, so the new rows adjust the fit instead of replacing it.
+    An SGD member (out-of-core or earlier incremental runs) just continues.
+    """
+    if isinstance(lr, SGDClassifier):
+        sgd = lr
+        sgd.partial_fit(X_new, y_new)
+    else:
+        # LogisticRegression minimises C * sum(loss) + |w|^2 / 2, i.e. mean loss + alpha |w|^2 / 2
+        # with alpha = 1 / (C * rows).
+        sgd = SGDClassifier(loss="log_loss", alpha=1.0 / (lr.C * (rows_seen + len(y_new))),
+                            random_state=RANDOM_STATE)
+        # partial_fit keeps coefficients and the step counter that are already set.
+        sgd.coef_, sgd.intercept_, sgd.t_ = lr.coef_.copy(), lr.intercept_.copy(), float(rows_seen)
+        sgd.partial_fit(X_new, y_new, classes=lr.classes_)
+    for _ in range(epochs - 1):
+        sgd.partial_fit(X_new, y_new)
+    return sgd
+
+
+def update_ensemble(current, X_new, y_new, rf_extra_trees, rf_max_trees, lr_epochs, rows_seen):
+    """
+    Returns a copy of the fitted ensemble updated with new rows: the random
+    forest grows `rf_extra_trees` trees fitted on the new rows (oldest trees are
+    dropped beyond `rf_max_trees`), and the linear member takes `lr_epochs` SGD
+    passes over them after the `rows_seen` it was trained on. Gradient boosting
+    cannot be extended on new data without refitting, so it is kept as is.
+    """
+    candidate = copy.deepcopy(current)
+    if len(np.unique(y_new)) < 2:
+        logging.warning("New rows contain a single class; ensemble left unchanged")
+        return candidate
+    members = candidate.named_estimators_
+
+    rf = members["rf"]
+    target = len(rf.estimators_) + rf_extra_trees
+    if target > rf_max_trees:
+        rf.estimators_ = rf.estimators_[target - rf_max_trees:]
+        target = rf_max_trees
+    rf.set_params(warm_start=True, n_estimators=target)
+    rf.fit(X_new, y_new)
+
+    members["lr"] = continue_linear(members["lr"], X_new, y_new, rows_seen, lr_epochs)
+
+    # VotingClassifier predicts from estimators_, which holds the same objects.
+    candidate.estimators_ = [members[name] for name, _ in candidate.estimators]
+    return candidate
+
+
+def evaluate(model, X, y):
+    """Metrics used to decide promotion; ROC AUC is None when y has a single class."""
+    y_pred, y_proba = score_batch(model, X)
+    return {
+        "log_loss": float(log_loss(y, y_proba, labels=[0, 1])),
+        "accuracy": float(accuracy_score(y, y_pred)),
+        "roc_auc": float(roc_auc_score(y, y_proba[:, 1])) if len(np.unique(y)) > 1 else None,
+    }
+
+
+def row_log_loss(model, X, y):
+    """Per-row log loss, for comparing two models on the same rows."""
+    _, y_proba = score_batch(model, X)
+    p = y_proba[np.arange(len(y)), np.asarray(y)]
+    return -np.log(np.clip(p, 1e-15, 1.0))
+
+
+def promotion_tolerance(current, candidate, X, y):
+    """
+    One standard error of the per-row log loss difference between candidate and
+    current on the same held-out rows; smaller differences are evaluation noise.
+    """
+    diff = row_log_loss(candidate, X, y) - row_log_loss(current, X, y)
+    return float(diff.std(ddof=1) / np.sqrt(len(diff))) if len(diff) > 1 else 0.0
+
+
+def run_incremental(args):
+    """
+    Updates the saved ensemble from rows appended since the last run and promotes
+    it unless it scores clearly worse on held-out new rows. Either way the
+    watermark moves past the new rows, so a rejected batch is not retried; its
+    rows are counted in the manifest and picked up by the next full training.
+    """
+    run_start = time.perf_counter()
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+        watermark = manifest["data"]["watermark"]
+    except (OSError, KeyError, ValueError):
+        raise RuntimeError(f"No training watermark in {MANIFEST_PATH}; run a full training first")
+
+    new_rows = read_new_rows(DATA_PATH, watermark)
+    source_rows = len(new_rows)
+    new_rows, issues = validate_frame(new_rows, args.validation_policy)
+    log_issues(issues, args.validation_policy, DATA_PATH)
+    logging.info(f"Incremental run: {len(new_rows)} valid of {source_rows} new rows after row {watermark['rows']}")
+    if len(new_rows) < args.min_new_rows:
+        print(f"{len(new_rows)} new rows (minimum {args.min_new_rows}); nothing to do.")
+        return
+
+    current = joblib.load(MODEL_PATH)
+    # The scaler is kept fixed so existing trees and coefficients stay valid.
+    scaler = joblib.load(SCALER_PATH)
+    X_new = new_rows[feature_columns].copy()
+    X_new[numerical_cols] = scaler.transform(X_new[numerical_cols])
+    y_new = new_rows["class"].astype(int)
+
+    stratify = y_new if y_new.value_counts().min() >= 2 else None
+    X_fit, X_eval, y_fit, y_eval = train_test_split(X_new, y_new, test_size=args.eval_fraction,
+                                                    random_state=RANDOM_STATE, stratify=stratify)
+
+    start = time.perf_counter()
+    candidate = update_ensemble(current, X_fit, y_fit, args.rf_extra_trees, args.rf_max_trees, args.lr_epochs,
+                                manifest["data"]["train_rows"])
+    fit_seconds = time.perf_counter() - start
+
+    current_metrics = evaluate(current, X_eval, y_eval)
+    candidate_metrics = evaluate(candidate, X_eval, y_eval)
+    tolerance = args.promote_tolerance
+    if tolerance is None:
+        tolerance = promotion_tolerance(current, candidate, X_eval, y_eval)
+    promoted = candidate_metrics["log_loss"] <= current_metrics["log_loss"] + tolerance
+    logging.info(f"Incremental candidate log loss {candidate_metrics['log_loss']:.4f} vs current "
+                 f"{current_metrics['log_loss']:.4f} (tolerance {tolerance:.4f}) on {len(y_eval)} held-out new rows; "
+                 f"promoted={promoted}")
+    print(f"New rows: {len(new_rows)} ({len(y_fit)} fit, {len(y_eval)} evaluation)")
+    print(f"Current   log loss {current_metrics['log_loss']:.4f}, accuracy {current_metrics['accuracy']:.4f}")
+    print(f"Candidate log loss {candidate_metrics['log_loss']:.4f}, accuracy {candidate_metrics['accuracy']:.4f}")
+    print(f"Tolerance {tolerance:.4f}")
+
+    rows = watermark["rows"] + source_rows
+    run = {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "rows_added": int(len(new_rows)),
+        "promoted": promoted,
+        "tolerance": tolerance,
+        # Gradient boosting cannot be extended, so it stays as fitted by the last full training.
+        "members": {"rf": "extended", "lr": "continued", "gb": "unchanged"},
+        "rf_trees": len(candidate.named_estimators_["rf"].estimators_),
+        "current": current_metrics,
+        "candidate": candidate_metrics,
+        "fit_seconds": round(fit_seconds, 3),
+    }
+    if not promoted:
+        manifest["data"].update(sha256=file_digest(DATA_PATH), source_rows=rows,
+                                watermark=data_watermark(DATA_PATH, rows),
+                                rejected_rows=manifest["data"].get("rejected_rows", 0) + len(new_rows))
+        run["total_seconds"] = round(time.perf_counter() - run_start, 3)
+        manifest.setdefault("incremental", []).append(run)
+        write_manifest(MANIFEST_PATH, manifest)
+        print(f"Candidate rejected; current model kept. Rows through {rows} will not be retried "
+              f"until the next full training.")
+        return
+
+    joblib.dump(candidate, MODEL_PATH)
+    logging.info(f"Promoted incremental model to {MODEL_PATH}")
+    importances = compute_importances(candidate, X_eval, y_eval, feature_columns, n_repeats=0)
+    save_importances(IMPORTANCE_PATH, importances)
+    artifacts = {"model": _artifact_info(MODEL_PATH), "scaler": _artifact_info(SCALER_PATH),
+                 "feature_importance": _artifact_info(IMPORTANCE_PATH), "compact_model": None}
+    if not args.no_compact:
+        compact_header = save_compact(COMPACT_MODEL_DIR, compile_ensemble(candidate), feature_columns,
+                                      numerical_cols, scaler, source_sha256=file_digest(MODEL_PATH))
+        artifacts["compact_model"] = _artifact_info(compact_header)
+    elif remove_compact(COMPACT_MODEL_DIR):
+        logging.info(f"Removed outdated compact model {COMPACT_MODEL_DIR}")
+
+    manifest["created_at"] = run["at"]
+    manifest["data"].setdefault("gb_train_rows", manifest["data"]["train_rows"])
+    manifest["data"].update(sha256=file_digest(DATA_PATH), rows=manifest["data"]["rows"] + len(new_rows),
+                            train_rows=manifest["data"]["train_rows"] + len(y_fit),
+                            source_rows=rows, watermark=data_watermark(DATA_PATH, rows))
+    # Permutation importance described the previous model; a full training recomputes it.
+    manifest["feature_importance"].update(combined=dict(zip(feature_columns, importances["model"]["combined"])),
+                                          permutation_auc_drop=None, permutation_stale=True)
+    manifest["artifacts"] = artifacts
+    run["total_seconds"] = round(time.perf_counter() - run_start, 3)
+    manifest.setdefault("incremental", []).append(run)
+    write_manifest(MANIFEST_PATH, manifest)
+    print(f"Candidate promoted: {MODEL_PATH} (trained through row {rows})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the lung cancer voting ensemble.")
+    parser.add_argument("--folds", type=int, default=5, help="Number of cross-validation folds")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for the search (default: CPU count)")
+    parser.add_argument("--cache-dir", default=CV_CACHE_DIR, help="Where fold-level CV results are cached")
+    parser.add_argument("--no-search", action="store_true", help="Cross-validate only the baseline configuration")
+    parser.add_argument("--no-compact", action="store_true", help="Skip exporting the memory-mappable compact model")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows parsed per CSV chunk")
+    parser.add_argument("--validation-policy", choices=VALIDATION_POLICIES, default="clip",
+                        help="How to handle values outside the prediction form's bounds")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-ingest the CSV even if the columnar cache is current")
+    parser.add_argument("--importance-repeats", type=int, default=DEFAULT_REPEATS,
+                        help="Shuffles per feature for permutation importance (0 to skip)")
+    out_of_core = parser.add_argument_group("out-of-core training")
+    out_of_core.add_argument("--out-of-core", action="store_true",
+                             help="Stream the columnar dataset in batches instead of loading it into memory")
+    out_of_core.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS, help="Rows per streamed batch")
+    out_of_core.add_argument("--sample-rows", type=int, default=DEFAULT_SAMPLE_ROWS,
+                             help="Training rows sampled for the tree models")
+    out_of_core.add_argument("--tree-rows", type=int, default=DEFAULT_TREE_ROWS,
+                             help="Bootstrap rows drawn from the sample by each forest tree")
+    out_of_core.add_argument("--eval-rows", type=int, default=DEFAULT_EVAL_ROWS,
+                             help="Held-out rows sampled for evaluation and permutation importance")
+    out_of_core.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS, help="SGD passes for the linear model")
+    incremental = parser.add_argument_group("incremental training")
+    incremental.add_argument("--incremental", action="store_true",
+                             help="Update the saved model from rows appended since the last run")
+    incremental.add_argument("--min-new-rows", type=int, default=20, help="Skip the update below this many new rows")
+    incremental.add_argument("--eval-fraction", type=float, default=0.2,
+                             help="Share of new rows held out to compare candidate and current model")
+    incremental.add_argument("--rf-extra-trees", type=int, default=20, help="Trees added to the random forest")
+    incremental.add_argument("--rf-max-trees", type=int, default=500, help="Oldest trees are dropped beyond this")
+    incremental.add_argument("--lr-epochs", type=int, default=5, help="SGD passes over the new rows for the linear model")
+    incremental.add_argument("--promote-tolerance", type=float, default=None,
+                             help="Promote if candidate log loss is at most current log loss plus this "
+                                  "(default: one standard error of the per-row difference)")
+    return parser.parse_args(argv)
+
+
+def fit_in_memory(dataset, args, timings):
+    """Loads the whole dataset, runs the cross-validated search and fits the ensemble on the training split."""
+    data = dataset.to_frame()
+    logging.info(f"Dataset in memory: {data.memory_usage(index=False).sum() / 1024:.1f} KB")
+    X = data.drop("class", axis=1)
+    y = data["class"]
+    logging.info("Data split into X and y")
+
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    try:
+        X[numerical_cols] = scaler.fit_transform(X[numerical_cols])
+        logging.info("Numerical features scaled")
+    except Exception as e:
+        logging.error(f"Error scaling features: {e}")
+        raise
+    timings["scale_seconds"] = time.perf_counter() - start
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE)
+    logging.info(f"Data split: {len(X_train)} train, {len(X_test)} test")
+
+    start = time.perf_counter()
+    try:
+        best_params, cv_results = run_search(X_train.to_numpy(), y_train.to_numpy(), n_folds=args.folds,
+                                             workers=args.workers, cache_dir=args.cache_dir, search=not args.no_search)
+        logging.info(f"Selected parameters: {best_params}")
+    except Exception as e:
+        logging.error(f"Error during cross-validated search: {e}")
+        raise
+    timings["search_seconds"] = time.perf_counter() - start
+
+    voting_clf = build_voting_classifier(best_params)
+    start = time.perf_counter()
+    try:
+        voting_clf.fit(X_train, y_train)
+        logging.info("Model training completed")
+    except Exception as e:
+        logging.error(f"Error training model: {e}")
+        raise
+    timings["fit_seconds"] = time.perf_counter() - start
+    return {"model": voting_clf, "scaler": scaler, "X_test": X_test, "y_test": y_test,
+            "train_rows": len(X_train), "test_rows": len(X_test),
+            "cv": {"folds": args.folds, "search": not args.no_search, "best_params": best_params,
+                   "results": cv_results}}
+
+
+def fit_out_of_core(dataset, args, timings):
+    """
+    Streams the columnar dataset in batches: the linear member is trained with
+    SGD over every training row, the tree members on a bounded uniform sample.
+    There is no cross-validated search in this mode.
+    """
+    start = time.perf_counter()
+    rf = clone(BASE_ESTIMATORS["rf"]).set_params(n_jobs=-1)
+    try:
+        fit = fit_streaming(dataset, rf, BASE_ESTIMATORS["gb"], test_size=0.2, batch_rows=args.batch_rows,
+                            sample_rows=args.sample_rows, tree_rows=args.tree_rows, eval_rows=args.eval_rows,
+                            epochs=args.epochs, seed=RANDOM_STATE)
+        logging.info(f"Out-of-core training completed on {fit['train_rows']} rows")
+    except Exception as e:
+        logging.error(f"Error during out-of-core training: {e}")
+        raise
+    timings.update(fit.pop("timings"))
+    timings["fit_seconds"] = time.perf_counter() - start
+    fit["cv"] = {"search": False, "batch_rows": args.batch_rows, "epochs": args.epochs,
+                 "sample_rows": fit.pop("sample_rows"), "tree_rows": args.tree_rows, "eval_rows": len(fit["y_test"])}
+    return fit
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging("train.log")
+    np.random.seed(RANDOM_STATE)
+    logging.info("Starting train_model.py")
+    if args.incremental:
+        return run_incremental(args)
+    timings = {}
+    run_start = time.perf_counter()
+
+    if not os.path.exists(DATA_PATH):
+        logging.error(f"Dataset not found at {DATA_PATH}")
+        raise FileNotFoundError(f"Dataset not found at {DATA_PATH}")
+
+    logging.info(f"Loading dataset from {DATA_PATH}")
+    start = time.perf_counter()
+    try:
+        dataset = load_dataset(DATA_PATH, chunksize=args.chunksize, policy=args.validation_policy,
+                               refresh=args.refresh_cache)
+        data_hash = dataset.meta["source_sha256"]
+        logging.info(f"Dataset loaded: {dataset.rows} rows, {len(expected_columns)} columns, sha256 {data_hash[:12]}")
+    except Exception as e:
+        logging.error(f"Error loading dataset: {e}")
+        raise
+    timings["load_seconds"] = time.perf_counter() - start
+
+    if args.out_of_core:
+        fit = fit_out_of_core(dataset, args, timings)
+    else:
+        fit = fit_in_memory(dataset, args, timings)
+    voting_clf, scaler = fit["model"], fit["scaler"]
+    X_test, y_test = fit["X_test"], fit["y_test"]
+
+    start = time.perf_counter()
+    y_pred, y_proba = score_batch(voting_clf, X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    roc_auc = roc_auc_score(y_test, y_proba[:, 1])
+    timings["evaluate_seconds"] = time.perf_counter() - start
+    logging.info(f"Model accuracy: {accuracy:.4f}, ROC AUC: {roc_auc:.4f}")
+    print(f"Accuracy: {accuracy:.4f}")
+    print(f"ROC AUC: {roc_auc:.4f}")
+    print("Classification Report:")
+    print(classification_report(y_test, y_pred, target_names=["Low Risk", "High Risk"]))
+
+    start = time.perf_counter()
+    try:
+        importances = compute_importances(voting_clf, X_test, y_test, feature_columns,
+                                          n_repeats=args.importance_repeats, workers=args.workers)
+    except Exception as e:
+        logging.error(f"Error computing feature importances: {e}")
+        raise
+    timings["importance_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        logging.info(f"Saving model to {MODEL_PATH}")
+        joblib.dump(voting_clf, MODEL_PATH)
+        file_size = os.path.getsize(MODEL_PATH) / 1024
+        logging.info(f"Model saved: {MODEL_PATH}, Size: {file_size:.2f} KB")
+    except Exception as e:
+        logging.error(f"Error saving model: {e}")
+        raise
+
+    try:
+        logging.info(f"Saving scaler to {SCALER_PATH}")
+        joblib.dump(scaler, SCALER_PATH)
+        file_size = os.path.getsize(SCALER_PATH) / 1024
+        logging.info(f"Scaler saved: {SCALER_PATH}, Size: {file_size:.2f} KB")
+    except Exception as e:
+        logging.error(f"Error saving scaler: {e}")
+        raise
+
+    try:
+        save_importances(IMPORTANCE_PATH, importances)
+        logging.info(f"Feature importances saved: {IMPORTANCE_PATH}")
+    except Exception as e:
+        logging.error(f"Error saving feature importances: {e}")
+        raise
+
+    compact_header = None
+    if not args.no_compact:
+        try:
+            logging.info(f"Exporting compact model to {COMPACT_MODEL_DIR}")
+            compact_header = save_compact(COMPACT_MODEL_DIR, compile_ensemble(voting_clf),
+                                          feature_columns, numerical_cols, scaler, file_digest(MODEL_PATH))
+            file_size = sum(os.path.getsize(os.path.join(COMPACT_MODEL_DIR, name))
+                            for name in os.listdir(COMPACT_MODEL_DIR)) / 1024
+            logging.info(f"Compact model saved: {COMPACT_MODEL_DIR}, Size: {file_size:.2f} KB")
+        except Exception as e:
+            logging.error(f"Error exporting compact model: {e}")
+            raise
+    elif remove_compact(COMPACT_MODEL_DIR):
+        # The registry prefers the compact export, so an old one would keep being served.
+        logging.info(f"Removed outdated compact model {COMPACT_MODEL_DIR}")
+    timings["save_seconds"] = time.perf_counter() - start
+    timings["total_seconds"] = time.perf_counter() - run_start
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "data": {"path": DATA_PATH, "sha256": data_hash, "rows": int(dataset.rows),
+                 "train_rows": int(fit["train_rows"]), "test_rows": int(fit["test_rows"]),
+                 "source_rows": dataset.meta["source_rows"],
+                 "validation": {"policy": args.validation_policy, "issues": dataset.meta["issues"]},
+                 "watermark": data_watermark(DATA_PATH, dataset.meta["source_rows"])},
+        "feature_order": feature_columns,
+        "numerical_cols": numerical_cols,
+        "scaler": {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()},
+        "cv": fit["cv"],
+        "training": {"mode": "out_of_core" if args.out_of_core else "in_memory"},
+        "metrics": {"accuracy": float(accuracy), "roc_auc": float(roc_auc),
+                    "report": classification_report(y_test, y_pred, target_names=["Low Risk", "High Risk"], output_dict=True)},
+        "feature_importance": {
+            "combined": dict(zip(feature_columns, importances["model"]["combined"])),
+            "permutation_auc_drop": (dict(zip(feature_columns, importances["permutation"]["mean"]))
+                                     if importances["permutation"] else None),
+        },
+        "timings": {key: round(value, 3) for key, value in timings.items()},
+        "artifacts": {"model": _artifact_info(MODEL_PATH), "scaler": _artifact_info(SCALER_PATH),
+                      "feature_importance": _artifact_info(IMPORTANCE_PATH),
+                      "compact_model": _artifact_info(compact_header) if compact_header else None},
+    }
+    try:
+        write_manifest(MANIFEST_PATH, manifest)
+        logging.info(f"Manifest written: {MANIFEST_PATH}")
+    except Exception as e:
+        logging.error(f"Error writing manifest: {e}")
+        raise
+
+    print(f"Model and scaler saved: {MODEL_PATH}, {SCALER_PATH}")
+    print(f"Manifest: {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
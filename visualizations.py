@@ -1,21 +1,19 @@
+from startup_profiler import page_loaded  # first, so import timing covers the whole page
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import os
-import joblib
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from PIL import Image
+from model_registry import MODEL_PATH, SCALER_PATH, get_model_and_scaler, model_version, registry
+from feature_importance import importance_path, load_importances, model_importances
+from figure_cache import cached_figure
+from dataset_aggregates import SYMPTOMS, get_aggregates
+from static_assets import apply_stylesheet
 
 # ---------------------------------------
 # Configuration: File Paths
 # ---------------------------------------
 BASE_DIR = os.path.dirname(__file__)
 DATA_PATH = os.path.join(BASE_DIR, '..', 'data', 'lung_cancer_new.csv')
-MODEL_PATH = os.path.join(BASE_DIR, '..', 'models', 'voting_model.pkl')
-SCALER_PATH = os.path.join(BASE_DIR, '..', 'models', 'scaler.pkl')
 
 # ---------------------------------------
 # Configuration: Color Palette (2025 Trends)
@@ -50,441 +48,23 @@ GRADIENTS = {
 }
 
 # ---------------------------------------
-# CSS: Comprehensive Tailwind-Inspired Styling
+# Background: Subtle Pattern (drawn by styles/visualizations.css, like the rest of the page styles)
 # ---------------------------------------
-MODERN_CSS = """
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Space+Grotesk:wght@400;500;600;700&display=swap');
-    
-    :root {
-        --primary: #3b82f6;
-        --primary-dark: #1d4ed8;
-        --secondary: #f0f9ff;
-        --accent: #14b8a6;
-        --accent-dark: #0d9488;
-        --danger: #ef4444;
-        --success: #10b981;
-        --warning: #f59e0b;
-        --gray: #64748b;
-        --text: #0f172a;
-        --text-light: #475569;
-        --background: #ffffff;
-        --card: #f8fafc;
-    }
-    
-    .stApp {
-        background-color: var(--background);
-        font-family: 'Inter', sans-serif;
-        color: var(--text);
-        overflow-x: hidden;
-        padding: 0;
-        margin: 0;
-    }
-    
-    h1, h2, h3, h4, h5, h6 {
-        font-family: 'Space Grotesk', sans-serif;
-        font-weight: 600;
-        line-height: 1.2;
-        margin: 0;
-    }
-    
-    h1 { font-size: 3.5rem; margin: 2rem 0; }
-    h2 { font-size: 2.5rem; margin: 1.5rem 0; }
-    h3 { font-size: 1.75rem; margin: 1rem 0; }
-    h4 { font-size: 1.25rem; margin: 0.75rem 0; }
-    h5 { font-size: 1rem; margin: 0.5rem 0; }
-    
-    .glass-card {
-        background: rgba(255, 255, 255, 0.7);
-        backdrop-filter: blur(12px);
-        -webkit-backdrop-filter: blur(12px);
-        border: 1px solid rgba(255, 255, 255, 0.18);
-        border-radius: 24px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        box-shadow: 0 8px 32px rgba(31, 38, 135, 0.1);
-        transition: all 0.3s ease;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .glass-card:hover {
-        transform: translateY(-6px);
-        box-shadow: 0 12px 40px rgba(31, 38, 135, 0.15);
-    }
-    
-    .neomorphic {
-        background: var(--card);
-        border-radius: 20px;
-        box-shadow: 10px 10px 20px rgba(0, 0, 0, 0.05),
-                    -10px -10px 20px rgba(255, 255, 255, 0.8);
-        padding: 1.5rem;
-        transition: all 0.3s ease;
-    }
-    
-    .neomorphic:hover {
-        box-shadow: 15px 15px 30px rgba(0, 0, 0, 0.07),
-                   -15px -15px 30px rgba(255, 255, 255, 0.9);
-    }
-    
-    .section-title {
-        font-size: 2.25rem;
-        font-weight: 700;
-        background: linear-gradient(135deg, var(--primary), var(--accent));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        margin-bottom: 2rem;
-        position: relative;
-    }
-    
-    .section-title::after {
-        content: "";
-        position: absolute;
-        bottom: -10px;
-        left: 50%;
-        transform: translateX(-50%);
-        width: 100px;
-        height: 4px;
-        background: linear-gradient(90deg, var(--primary), var(--accent));
-        border-radius: 2px;
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        color: white;
-        padding: 1.5rem;
-        border-radius: 16px;
-        text-align: center;
-        box-shadow: 0 10px 25px rgba(59, 130, 246, 0.3);
-        transition: all 0.5s ease;
-        position: relative;
-        overflow: hidden;
-        transform: perspective(1000px) rotateX(0deg);
-    }
-    
-    .metric-card::before {
-        content: "";
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(135deg, rgba(255,255,255,0.15), rgba(255,255,255,0));
-        z-index: 1;
-    }
-    
-    .metric-card:hover {
-        transform: perspective(1000px) rotateX(10deg) translateY(-5px);
-        box-shadow: 0 20px 30px rgba(59, 130, 246, 0.4);
-    }
-    
-    .metric-label {
-        font-size: 1rem;
-        font-weight: 500;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        margin-bottom: 0.5rem;
-        opacity: 0.9;
-        z-index: 2;
-        position: relative;
-    }
-    
-    .metric-value {
-        font-size: 2.5rem;
-        font-weight: 700;
-        line-height: 1;
-        margin-bottom: 0.5rem;
-        font-family: 'Space Grotesk', sans-serif;
-        z-index: 2;
-        position: relative;
-    }
-    
-    .metric-desc {
-        font-size: 0.9rem;
-        opacity: 0.8;
-        z-index: 2;
-        position: relative;
-    }
-    
-    .explanation-text {
-        font-size: 1.05rem;
-        color: var(--text-light);
-        line-height: 1.8;
-        margin: 1.5rem 0;
-    }
-    
-    .explanation-text strong {
-        color: var(--text);
-        font-weight: 600;
-    }
-    
-    .chart-container {
-        padding: 1rem;
-        border-radius: 16px;
-        background: var(--card);
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.05);
-        margin: 1.5rem 0;
-        transition: all 0.3s ease;
-    }
-    
-    .chart-container:hover {
-        box-shadow: 0 8px 30px rgba(0, 0, 0, 0.08);
-    }
-    
-    .tooltip {
-        position: relative;
-        display: inline-block;
-    }
-    
-    .tooltip .tooltiptext {
-        visibility: hidden;
-        width: 220px;
-        background-color: var(--primary-dark);
-        color: white;
-        text-align: center;
-        border-radius: 8px;
-        padding: 0.75rem;
-        position: absolute;
-        z-index: 10;
-        bottom: 125%;
-        left: 50%;
-        transform: translateX(-50%);
-        opacity: 0;
-        transition: opacity 0.3s;
-        font-size: 0.9rem;
-        line-height: 1.4;
-    }
-    
-    .tooltip:hover .tooltiptext {
-        visibility: visible;
-        opacity: 1;
-    }
-    
-    .modal {
-        display: none;
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background: rgba(0, 0, 0, 0.5);
-        z-index: 100;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .modal-content {
-        background: var(--card);
-        border-radius: 16px;
-        padding: 2rem;
-        max-width: 600px;
-        width: 90%;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.2);
-        position: relative;
-    }
-    
-    .close-button {
-        position: absolute;
-        top: 1rem;
-        right: 1rem;
-        background: none;
-        border: none;
-        font-size: 1.5rem;
-        cursor: pointer;
-        color: var(--gray);
-    }
-    
-    @keyframes float {
-        0% { transform: translateY(0px); }
-        50% { transform: translateY(-10px); }
-        100% { transform: translateY(0px); }
-    }
-    
-    .floating {
-        animation: float 6s ease-in-out infinite;
-    }
-    
-    @keyframes breathing {
-        0% { box-shadow: 0 0 10px rgba(59, 130, 246, 0.3); }
-        50% { box-shadow: 0 0 20px rgba(59, 130, 246, 0.6); }
-        100% { box-shadow: 0 0 10px rgba(59, 130, 246, 0.3); }
-    }
-    
-    .breathing {
-        animation: breathing 4s infinite ease-in-out;
-    }
-    
-    @keyframes pulse {
-        0% { transform: scale(1); }
-        50% { transform: scale(1.05); }
-        100% { transform: scale(1); }
-    }
-    
-    .pulse {
-        animation: pulse 2s infinite ease-in-out;
-    }
-    
-    @keyframes fadeIn {
-        0% { opacity: 0; }
-        100% { opacity: 1; }
-    }
-    
-    .fade-in {
-        animation: fadeIn 1s ease-in;
-    }
-    
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(360deg); }
-    }
-    
-    .spinner {
-        border: 4px solid rgba(59, 130, 246, 0.2);
-        border-top: 4px solid var(--primary);
-        border-radius: 50%;
-        width: 40px;
-        height: 40px;
-        animation: spin 1s linear infinite;
-        margin: 2rem auto;
-    }
-    
-    .progress-container {
-        width: 100%;
-        height: 8px;
-        background: rgba(59, 130, 246, 0.1);
-        border-radius: 4px;
-        margin: 1rem 0;
-    }
-    
-    .progress-bar {
-        height: 100%;
-        border-radius: 4px;
-        background: linear-gradient(90deg, var(--primary), var(--accent));
-        transition: width 1s ease-in-out;
-    }
-    
-    .switch {
-        position: relative;
-        display: inline-block;
-        width: 60px;
-        height: 34px;
-    }
-    
-    .switch input {
-        opacity: 0;
-        width: 0;
-        height: 0;
-    }
-    
-    .slider {
-        position: absolute;
-        cursor: pointer;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background-color: #ccc;
-        transition: .4s;
-        border-radius: 34px;
-    }
-    
-    .slider:before {
-        position: absolute;
-        content: "";
-        height: 26px;
-        width: 26px;
-        left: 4px;
-        bottom: 4px;
-        background-color: white;
-        transition: .4s;
-        border-radius: 50%;
-    }
-    
-    input:checked + .slider {
-        background-color: var(--primary);
-    }
-    
-    input:checked + .slider:before {
-        transform: translateX(26px);
-    }
-    
-    .collapsible {
-        background-color: var(--secondary);
-        color: var(--text);
-        cursor: pointer;
-        padding: 1rem;
-        width: 100%;
-        border: none;
-        text-align: left;
-        outline: none;
-        font-size: 1rem;
-        border-radius: 8px;
-        margin: 0.5rem 0;
-    }
-    
-    .collapsible:hover {
-        background-color: var(--primary);
-        color: white;
-    }
-    
-    .content {
-        padding: 0 1rem;
-        display: none;
-        overflow: hidden;
-        background-color: var(--card);
-        border-radius: 8px;
-    }
-    
-    @media (max-width: 768px) {
-        h1 { font-size: 2.5rem; }
-        h2 { font-size: 1.75rem; }
-        h3 { font-size: 1.5rem; }
-        .glass-card { padding: 1.5rem; }
-        .metric-card { padding: 1rem; }
-        .metric-value { font-size: 2rem; }
-        .section-title { font-size: 1.75rem; }
-        .tooltip .tooltiptext { width: 180px; }
-    }
-    
-    @media (max-width: 480px) {
-        h1 { font-size: 2rem; }
-        h2 { font-size: 1.5rem; }
-        h3 { font-size: 1.25rem; }
-        .section-title { font-size: 1.5rem; }
-        .metric-card { margin: 0.5rem 0; }
-        .tooltip .tooltiptext { width: 140px; }
-    }
-</style>
-"""
-
-# ---------------------------------------
-# Background: Subtle SVG Pattern
-# ---------------------------------------
-BACKGROUND_SVG = """
-<div style="position: fixed; top: 0; left: 0; width: 100%; height: 100%; z-index: -1; opacity: 0.03;">
-    <svg width="100%" height="100%" xmlns="http://www.w3.org/2000/svg">
-        <pattern id="pattern" x="0" y="0" width="40" height="40" patternUnits="userSpaceOnUse">
-            <path d="M0 20 L40 20 M20 0 L20 40" stroke="#3b82f6" stroke-width="0.5"/>
-            <circle cx="20" cy="20" r="1" fill="#3b82f6" />
-        </pattern>
-        <rect width="100%" height="100%" fill="url(#pattern)" />
-    </svg>
-</div>
-"""
+BACKGROUND = '<div class="background-pattern"></div>'
 
 # ---------------------------------------
 # Helper Function: Data Loading
 # ---------------------------------------
-@st.cache_data
-def load_dataset():
+def load_aggregates():
+    """Returns the precomputed dataset summary the charts are drawn from."""
     try:
-        df = pd.read_csv(DATA_PATH)
-        df.columns = df.columns.str.lower().str.replace(' ', '_')
-        return df
+        return get_aggregates(DATA_PATH)
     except FileNotFoundError:
         st.error("Error: Dataset not found at 'data/lung_cancer_new.csv'. Please check the file path.")
         return None
+    except ValueError:
+        st.error("Dataset is missing required columns.")
+        return None
     except Exception as e:
         st.error(f"Error loading dataset: {str(e)}")
         return None
@@ -492,12 +72,9 @@ def load_dataset():
 # ---------------------------------------
 # Helper Function: Model Loading
 # ---------------------------------------
-@st.cache_resource
 def load_model_and_scaler():
     try:
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH) if os.path.exists(SCALER_PATH) else None
-        return model, scaler
+        return get_model_and_scaler(MODEL_PATH, SCALER_PATH)
     except FileNotFoundError:
         st.error("Error: Model or scaler file not found in 'models/' directory.")
         return None, None
@@ -505,20 +82,40 @@ def load_model_and_scaler():
         st.error(f"Error loading model/scaler: {str(e)}")
         return None, None
 
+# ---------------------------------------
+# Helper Function: Feature Importance Loading
+# ---------------------------------------
+def load_feature_importances(model):
+    """
+    Returns the importance report written by train_model.py next to the model.
+    Without one, importances are read from the ensemble members if the pickled
+    ensemble is loaded; returns None when neither is available.
+    """
+    path = importance_path(MODEL_PATH)
+    if os.path.exists(path):
+        try:
+            return registry.get(path, loader=load_importances)
+        except Exception as e:
+            st.error(f"Error loading feature importances: {str(e)}")
+            return None
+    if hasattr(model, 'named_estimators_'):
+        return {"model": model_importances(model), "permutation": None}
+    return None
+
 # ---------------------------------------
 # Visualization: Feature Importance Chart
 # ---------------------------------------
-def create_feature_importance_chart(model):
+def create_feature_importance_chart(report):
     features = [
         "Age", "Sex", "Smoking", "Persistent Cough", "Fatigue",
         "Coughing Blood", "Chest Pain", "Weight Loss", "Tumor Size",
         "Alk Phosphate", "SGOT", "Lung Function", "Tumor Marker", "Histology"
     ]
-    if hasattr(model, 'feature_importances_'):
-        importances = model.feature_importances_ * 100
-    else:
-        importances = np.array([15, 5, 25, 10, 8, 7, 6, 8, 12, 5, 4, 6, 5, 4])
-        importances = importances / importances.sum() * 100
+    importances = np.array(report["model"]["combined"]) * 100
+    permutation = report.get("permutation")
+    hovertemplate = "%{y}: %{x:.1f}%"
+    if permutation:
+        hovertemplate += "<br>AUC drop when shuffled: %{customdata:.3f}"
 
     fig = go.Figure(data=[
         go.Bar(
@@ -530,7 +127,8 @@ def create_feature_importance_chart(model):
                 colorscale=[[0, COLORS["primary"]], [0.5, COLORS["accent"]], [1, COLORS["accent_dark"]]],
                 line=dict(color='#ffffff', width=1.5)
             ),
-            hovertemplate="%{y}: %{x:.1f}%"
+            customdata=permutation["mean"] if permutation else None,
+            hovertemplate=hovertemplate
         )
     ])
     fig.update_layout(
@@ -556,19 +154,20 @@ def create_feature_importance_chart(model):
 # ---------------------------------------
 # Visualization: Smoking vs. Risk Chart
 # ---------------------------------------
-def create_smoking_risk_chart(df):
-    smoking_risk = df.groupby(['smoking', 'class']).size().unstack(fill_value=0)
+def create_smoking_risk_chart(agg):
+    # smoking_by_class[smoking][class]
+    smoking_risk = np.array(agg["smoking_by_class"])
     fig = go.Figure(data=[
         go.Bar(
             x=['Non-Smoker', 'Smoker'],
-            y=smoking_risk[0],
+            y=smoking_risk[:, 0],
             name='Low Risk',
             marker_color=COLORS["success"],
             opacity=0.85
         ),
         go.Bar(
             x=['Non-Smoker', 'Smoker'],
-            y=smoking_risk[1],
+            y=smoking_risk[:, 1],
             name='High Risk',
             marker_color=COLORS["danger"],
             opacity=0.85
@@ -609,22 +208,49 @@ def create_smoking_risk_chart(df):
 # ---------------------------------------
 # Visualization: Tumor Size vs. Risk Chart
 # ---------------------------------------
-def create_tumor_size_chart(df):
+def create_tumor_size_chart(agg):
+    # Violins are drawn from the precomputed density curve and box statistics,
+    # so the chart never needs the per-patient values.
     fig = go.Figure()
-    for risk_level, color, name in [(0, COLORS["success"], 'Low Risk'), (1, COLORS["danger"], 'High Risk')]:
-        fig.add_trace(go.Violin(
-            x=[name] * len(df[df['class'] == risk_level]),
-            y=df[df['class'] == risk_level]['tumor_size'],
+    for position, (risk_level, color, name) in enumerate([(0, COLORS["success"], 'Low Risk'), (1, COLORS["danger"], 'High Risk')]):
+        summary = agg["tumor_size"][str(risk_level)]
+        y = np.array(summary["kde"]["y"])
+        density = np.array(summary["kde"]["density"])
+        half_width = 0.4 * density / density.max() if density.max() > 0 else density
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([position - half_width, (position + half_width)[::-1]]),
+            y=np.concatenate([y, y[::-1]]),
+            fill='toself',
+            mode='lines',
             name=name,
-            box_visible=True,
-            meanline_visible=True,
             fillcolor=color,
             opacity=0.7,
             line_color='#ffffff',
-            points='outliers',
-            marker=dict(size=5),
+            hoverinfo='skip'
+        ))
+        box = summary["box"]
+        if box["median"] is None:
+            continue
+        fig.add_trace(go.Box(
+            x=[position],
+            q1=[box["q1"]], median=[box["median"]], q3=[box["q3"]], mean=[box["mean"]],
+            lowerfence=[box["lowerfence"]], upperfence=[box["upperfence"]],
+            name=name,
+            width=0.08,
+            fillcolor='#ffffff',
+            line_color=color,
+            showlegend=False,
             hovertemplate="Tumor Size: %{y:.1f} cm"
         ))
+        if box["outliers"]:
+            fig.add_trace(go.Scatter(
+                x=[position] * len(box["outliers"]),
+                y=box["outliers"],
+                mode='markers',
+                marker=dict(size=5, color=color),
+                showlegend=False,
+                hovertemplate="Tumor Size: %{y:.1f} cm"
+            ))
     fig.update_layout(
         title=dict(
             text="Tumor Size Signals Higher Risk",
@@ -638,7 +264,8 @@ def create_tumor_size_chart(df):
         paper_bgcolor='rgba(0,0,0,0)',
         height=500,
         margin=dict(l=40, r=40, t=100, b=40),
-        xaxis=dict(showgrid=False, tickfont=dict(size=12)),
+        xaxis=dict(showgrid=False, zeroline=False, tickfont=dict(size=12),
+                   tickvals=[0, 1], ticktext=['Low Risk', 'High Risk'], range=[-0.6, 1.6]),
         yaxis=dict(gridcolor='rgba(0,0,0,0.1)', zeroline=False, tickfont=dict(size=12)),
         legend=dict(
             orientation="h",
@@ -655,16 +282,19 @@ def create_tumor_size_chart(df):
 # ---------------------------------------
 # Visualization: Age vs. Risk Chart
 # ---------------------------------------
-def create_age_risk_chart(df):
+def create_age_risk_chart(agg):
+    hist = agg["age_hist"]
+    width = hist["bin_width"]
+    centers = hist["bin_start"] + width * (np.arange(len(hist["density"][0])) + 0.5)
     fig = go.Figure()
     for risk_level, color, name in [(0, COLORS["success"], 'Low Risk'), (1, COLORS["danger"], 'High Risk')]:
-        fig.add_trace(go.Histogram(
-            x=df[df['class'] == risk_level]['age'],
-            histnorm='probability density',
+        fig.add_trace(go.Bar(
+            x=centers,
+            y=hist["density"][risk_level],
+            width=width,
             name=name,
             marker_color=color,
             opacity=0.75,
-            xbins=dict(size=5),
             hovertemplate="Age: %{x}<br>Proportion: %{y:.2f}"
         ))
     fig.update_traces(
@@ -701,10 +331,9 @@ def create_age_risk_chart(df):
 # ---------------------------------------
 # Visualization: Symptom Prevalence Chart
 # ---------------------------------------
-def create_symptom_prevalence_chart(df):
-    symptoms = ['persistent_cough', 'fatigue', 'cough_blood', 'chest_pain', 'weight_loss']
+def create_symptom_prevalence_chart(agg):
     symptom_names = ['Persistent Cough', 'Fatigue', 'Coughing Blood', 'Chest Pain', 'Weight Loss']
-    prevalence = [df[df['class'] == 1][symptom].mean() * 100 for symptom in symptoms]
+    prevalence = [agg["symptom_prevalence"][symptom] for symptom in SYMPTOMS]
     
     fig = go.Figure(data=[
         go.Bar(
@@ -738,12 +367,37 @@ def create_symptom_prevalence_chart(df):
     )
     return fig
 
+# ---------------------------------------
+# Cached Figures
+# ---------------------------------------
+INSIGHT_CHARTS = {
+    "smoking_risk": create_smoking_risk_chart,
+    "tumor_size": create_tumor_size_chart,
+    "age_risk": create_age_risk_chart,
+    "symptom_prevalence": create_symptom_prevalence_chart,
+}
+
+def insight_figure(name, agg):
+    return cached_figure((name, agg["sha256"]), lambda: INSIGHT_CHARTS[name](agg))
+
+def feature_importance_figure(report):
+    key = ("feature_importance", model_version(MODEL_PATH), registry.version(importance_path(MODEL_PATH)))
+    return cached_figure(key, lambda: create_feature_importance_chart(report))
+
+def prime_figures(agg, model):
+    """Builds every chart of this page into the figure cache (used by warmup.py); returns how many."""
+    figures = [insight_figure(name, agg) for name in INSIGHT_CHARTS]
+    report = load_feature_importances(model)
+    if report is not None:
+        figures.append(feature_importance_figure(report))
+    return len(figures)
+
 # ---------------------------------------
 # Main Function: Visualizations Page
 # ---------------------------------------
 def show_visualizations_page():
-    st.markdown(MODERN_CSS, unsafe_allow_html=True)
-    st.markdown(BACKGROUND_SVG, unsafe_allow_html=True)
+    apply_stylesheet("visualizations")
+    st.markdown(BACKGROUND, unsafe_allow_html=True)
     
     st.markdown('<div style="max-width: 1200px; margin: auto; padding: 20px;" class="fade-in">', unsafe_allow_html=True)
 
@@ -757,17 +411,10 @@ def show_visualizations_page():
     """, unsafe_allow_html=True)
 
     with st.spinner("Loading dataset and model..."):
-        df = load_dataset()
+        agg = load_aggregates()
         model, scaler = load_model_and_scaler()
 
-    if df is None or model is None:
-        st.markdown('</div>', unsafe_allow_html=True)
-        return
-
-    required_columns = ['age', 'smoking', 'tumor_size', 'class', 'persistent_cough', 'fatigue', 
-                        'cough_blood', 'chest_pain', 'weight_loss']
-    if not all(col in df.columns for col in required_columns):
-        st.error("Dataset is missing required columns.")
+    if agg is None or model is None:
         st.markdown('</div>', unsafe_allow_html=True)
         return
 
@@ -819,8 +466,12 @@ def show_visualizations_page():
     # Feature Importance Chart
     st.markdown('<div class="chart-container neomorphic">', unsafe_allow_html=True)
     st.markdown('<h4 class="section-title">What Drives Risk?</h4>', unsafe_allow_html=True)
-    feature_fig = create_feature_importance_chart(model)
-    st.plotly_chart(feature_fig, use_container_width=True)
+    importance_report = load_feature_importances(model)
+    if importance_report is None:
+        st.info("Feature importances are not available for this model. Re-run train_model.py to compute them.")
+    else:
+        feature_fig = feature_importance_figure(importance_report)
+        st.plotly_chart(feature_fig, use_container_width=True)
     st.markdown("""
         <p class="explanation-text">
             <strong>Why it matters</strong>: Smoking and tumor size are top predictors. 
@@ -837,7 +488,7 @@ def show_visualizations_page():
     # Smoking Risk Chart
     st.markdown('<div class="chart-container neomorphic">', unsafe_allow_html=True)
     st.markdown('<h4 class="section-title">Smoking Impact</h4>', unsafe_allow_html=True)
-    smoking_fig = create_smoking_risk_chart(df)
+    smoking_fig = insight_figure("smoking_risk", agg)
     st.plotly_chart(smoking_fig, use_container_width=True)
     st.markdown("""
         <p class="explanation-text">
@@ -851,7 +502,7 @@ def show_visualizations_page():
     # Tumor Size Chart
     st.markdown('<div class="chart-container neomorphic">', unsafe_allow_html=True)
     st.markdown('<h4 class="section-title">Tumor Size Impact</h4>', unsafe_allow_html=True)
-    tumor_fig = create_tumor_size_chart(df)
+    tumor_fig = insight_figure("tumor_size", agg)
     st.plotly_chart(tumor_fig, use_container_width=True)
     st.markdown("""
         <p class="explanation-text">
@@ -865,7 +516,7 @@ def show_visualizations_page():
     # Age Risk Chart
     st.markdown('<div class="chart-container neomorphic">', unsafe_allow_html=True)
     st.markdown('<h4 class="section-title">Age Impact</h4>', unsafe_allow_html=True)
-    age_fig = create_age_risk_chart(df)
+    age_fig = insight_figure("age_risk", agg)
     st.plotly_chart(age_fig, use_container_width=True)
     st.markdown("""
         <p class="explanation-text">
@@ -879,7 +530,7 @@ def show_visualizations_page():
     # Symptom Prevalence Chart
     st.markdown('<div class="chart-container neomorphic">', unsafe_allow_html=True)
     st.markdown('<h4 class="section-title">Common Symptoms</h4>', unsafe_allow_html=True)
-    symptom_fig = create_symptom_prevalence_chart(df)
+    symptom_fig = insight_figure("symptom_prevalence", agg)
     st.plotly_chart(symptom_fig, use_container_width=True)
     st.markdown("""
         <p class="explanation-text">
@@ -897,4 +548,5 @@ def show_visualizations_page():
 # Entry Point
 # ---------------------------------------
 if __name__ == "__main__":
-    show_visualizations_page()
\ No newline at end of file
+    show_visualizations_page()
+    page_loaded("visualizations")
\ No newline at end of file
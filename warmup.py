@@ -0,0 +1,191 @@
+"""
+Process warm-up: load the model, exercise predict_proba and build the
+dataset summary and insight charts before the first user request.
+
+The inference server runs it before answering GET /health with 200; until
+then /health and /predict return 503. A Streamlit process has no startup
+hook, so launch it through this module to warm up while the server starts:
+
+    python -m warmup --serve app.py [streamlit options]
+
+Readiness is also written to PULMO_READY_FILE when set, for exec-style
+readiness probes. `python -m warmup` on its own runs every step once and
+prints the timings.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from dataset_aggregates import DATA_PATH, get_aggregates
+from feature_schema import schema
+from inference import preprocess_batch
+from metrics import STAGE_SECONDS, metrics
+from model_registry import MODEL_PATH, SCALER_PATH, get_model_and_scaler
+
+READY_FILE = os.environ.get("PULMO_READY_FILE", "")
+# Row counts predict_proba is exercised with: a single patient and a full micro-batch.
+WARMUP_BATCH_SIZES = (1, 64)
+
+
+def dummy_rows(n: int) -> np.ndarray:
+    """`n` in-range feature rows: numerical columns at mid-range, flags alternating."""
+    X = schema.empty(n)
+    X[:] = (schema.low + schema.high) / 2
+    X[:, schema.binary] = (np.arange(n) % 2)[:, None]
+    return X
+
+
+class Warmup:
+    """
+    Runs the warm-up steps once per process and tracks readiness.
+
+    The model and a dummy prediction are required; the dataset summary and
+    charts only serve the insights page, so a failure there is logged and the
+    process still becomes ready.
+    """
+
+    def __init__(self):
+        self.state = "pending"
+        self.steps: Dict[str, float] = {}
+        self.skipped: Dict[str, str] = {}
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _step(self, name: str, func, required: bool = True):
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            if required:
+                raise
+            self.skipped[name] = str(e)
+            logging.warning(f"Warm-up step {name} skipped: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        self.steps[name] = round(elapsed * 1000, 1)
+        metrics.observe(STAGE_SECONDS, elapsed, pipeline="warmup", stage=name)
+        return result
+
+    def run(self, model_path: str = MODEL_PATH, scaler_path: str = SCALER_PATH,
+            data_path: Optional[str] = DATA_PATH, figures: bool = False) -> bool:
+        """Runs every step in the calling thread; returns whether the process is ready."""
+        with self._lock:
+            if self.state != "pending":
+                self._done.wait()
+                return self.ready
+            self.state = "warming"
+        _clear_ready_file()
+        start = time.perf_counter()
+        try:
+            model, scaler = self._step("model", lambda: get_model_and_scaler(model_path, scaler_path))
+            self._step("predict", lambda: [model.predict_proba(preprocess_batch(dummy_rows(n), scaler))
+                                           for n in WARMUP_BATCH_SIZES])
+            agg = self._step("aggregates", lambda: get_aggregates(data_path), required=False) if data_path else None
+            if figures and agg is not None:
+                self._step("figures", lambda: _prime_figures(agg, model), required=False)
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logging.error(f"Warm-up failed: {e}")
+        else:
+            self.state = "ready"
+            _write_ready_file()
+            logging.info(f"Warm-up finished in {(time.perf_counter() - start) * 1000:.1f} ms: {self.steps}")
+        finally:
+            self._done.set()
+        return self.ready
+
+    def start(self, **kwargs) -> None:
+        """Runs the warm-up on a daemon thread; later calls do nothing."""
+        with self._lock:
+            if self._thread is not None or self.state != "pending":
+                return
+            self._thread = threading.Thread(target=self.run, kwargs=kwargs, name="warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def snapshot(self) -> Dict[str, Any]:
+        status = {"state": self.state, "steps_ms": dict(self.steps)}
+        if self.skipped:
+            status["skipped"] = dict(self.skipped)
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+warmup = Warmup()
+
+
+def start_warmup(**kwargs) -> None:
+    warmup.start(**kwargs)
+
+
+def _prime_figures(agg: Dict[str, Any], model) -> int:
+    # The charts live with the insights page, which also pulls in Streamlit and Plotly.
+    from visualizations import prime_figures
+
+    return prime_figures(agg, model)
+
+
+def _write_ready_file() -> None:
+    if READY_FILE:
+        with open(READY_FILE, "w") as f:
+            f.write(f"{os.getpid()}\n")
+
+
+def _clear_ready_file() -> None:
+    if READY_FILE and os.path.exists(READY_FILE):
+        os.remove(READY_FILE)
+
+
+# ---------------------------------------
+# Command line
+# ---------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m warmup", description="Warm up models and caches.",
+                                     allow_abbrev=False)
+    parser.add_argument("--model", default=MODEL_PATH, help="Path to the trained model")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="Path to the fitted scaler")
+    parser.add_argument("--data", default=DATA_PATH, help="Dataset the insight charts are drawn from")
+    parser.add_argument("--no-figures", action="store_true", help="Skip building the insight charts")
+    parser.add_argument("--serve", metavar="SCRIPT", help="Start `streamlit run SCRIPT` in this process while warming up")
+    args, streamlit_args = parser.parse_known_args(argv)
+    options = dict(model_path=args.model, scaler_path=args.scaler, data_path=args.data, figures=not args.no_figures)
+
+    if args.serve:
+        # Same process as the Streamlit server, so the registry and caches it fills are the ones pages use.
+        from streamlit.web import cli as streamlit_cli
+
+        start_warmup(**options)
+        sys.argv = ["streamlit", "run", args.serve] + streamlit_args
+        return streamlit_cli.main()
+
+    if streamlit_args:
+        parser.error(f"unrecognized arguments: {' '.join(streamlit_args)}")
+    ready = warmup.run(**options)
+    for name, ms in warmup.steps.items():
+        print(f"{name:<12}{ms:>10.1f} ms")
+    for name, reason in warmup.skipped.items():
+        print(f"{name:<12}   skipped: {reason}")
+    if not ready:
+        print(f"Warm-up failed: {warmup.error}")
+    return 0 if ready else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())